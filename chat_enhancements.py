@@ -13,6 +13,19 @@ from pygments.lexers import get_lexer_by_name, guess_lexer
 from pygments.formatters import HtmlFormatter
 from pygments.util import ClassNotFound
 
+NCC_TOPIC_KEYWORDS = ('drill', 'parade', 'camp', 'training', 'uniform', 'rank', 'ceremony')
+
+# Patterns for _format_ncc_content, compiled once. All ranks are matched in a single scan;
+# longer ranks come first so "Lance Corporal" is not also wrapped again as "Corporal".
+_NCC_NAME_RE = re.compile(r'\b(NCC|National Cadet Corps)\b')
+_DRILL_COMMAND_RE = re.compile(r'\b(Attention|Stand at ease|Quick march|Halt|Left turn|Right turn|About turn)\b')
+NCC_RANKS = ('Cadet', 'Lance Corporal', 'Corporal', 'Sergeant', 'Under Officer', 'Warrant Officer')
+_RANK_BY_LOWER = {rank.lower(): rank for rank in NCC_RANKS}
+_RANK_RE = re.compile(
+    r'\b(' + '|'.join(re.escape(rank) for rank in sorted(NCC_RANKS, key=len, reverse=True)) + r')\b',
+    re.IGNORECASE
+)
+
 class ChatEnhancements:
     """Enhanced chat functionality with advanced features"""
     
@@ -38,29 +51,17 @@ class ChatEnhancements:
     def _format_ncc_content(content: str) -> str:
         """Format NCC-specific content patterns"""
         # Highlight NCC regulations and references
-        content = re.sub(
-            r'\b(NCC|National Cadet Corps)\b',
-            r'<span class="ncc-highlight">\1</span>',
-            content
-        )
+        content = _NCC_NAME_RE.sub(r'<span class="ncc-highlight">\1</span>', content)
         
         # Format drill commands
-        content = re.sub(
-            r'\b(Attention|Stand at ease|Quick march|Halt|Left turn|Right turn|About turn)\b',
-            r'<strong class="drill-command">\1</strong>',
+        content = _DRILL_COMMAND_RE.sub(r'<strong class="drill-command">\1</strong>', content)
+        
+        # Format ranks (one pass for all ranks, written in their canonical capitalisation)
+        content = _RANK_RE.sub(
+            lambda m: f'<span class="rank-highlight">{_RANK_BY_LOWER[m.group(1).lower()]}</span>',
             content
         )
         
-        # Format ranks
-        ranks = ['Cadet', 'Lance Corporal', 'Corporal', 'Sergeant', 'Under Officer', 'Warrant Officer']
-        for rank in ranks:
-            content = re.sub(
-                f'\\b{rank}\\b',
-                f'<span class="rank-highlight">{rank}</span>',
-                content,
-                flags=re.IGNORECASE
-            )
-        
         return content
     
     @staticmethod
@@ -202,7 +203,7 @@ class ChatEnhancements:
         }
         
         timestamps = []
-        all_content = ""
+        content_parts = []  # Lowercased once per message, joined once at the end
         
         for message in messages:
             role = message.get('role', '')
@@ -215,7 +216,7 @@ class ChatEnhancements:
                 stats["assistant_messages"] += 1
             
             stats["total_words"] += len(content.split())
-            all_content += " " + content
+            content_parts.append(content.lower())
             
             # Parse timestamp
             try:
@@ -229,11 +230,9 @@ class ChatEnhancements:
             duration = max(timestamps) - min(timestamps)
             stats["conversation_duration"] = str(duration)
         
-        # Extract topics (simple keyword extraction)
-        ncc_keywords = ['drill', 'parade', 'camp', 'training', 'uniform', 'rank', 'parade', 'ceremony']
-        for keyword in ncc_keywords:
-            if keyword in all_content.lower():
-                stats["topics_discussed"].append(keyword.title())
+        # Extract topics (simple keyword extraction) in a single pass over the lowercased text
+        all_content = " ".join(content_parts)
+        stats["topics_discussed"] = [keyword.title() for keyword in NCC_TOPIC_KEYWORDS if keyword in all_content]
         
         return stats
 
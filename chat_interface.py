@@ -255,7 +255,7 @@ def submit_prompt(prompt):
     clean_prompt = validation_result['message']
     
     # Record timestamp for the user message
-    user_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    user_timestamp = datetime.now().isoformat(sep=" ", timespec="seconds")
     
     # Create user message object
     user_message = {
@@ -301,7 +301,7 @@ def submit_prompt(prompt):
                 # Successful response
                 st.session_state.cooldown_active = False
                 st.session_state.cooldown_time_remaining = 0
-                assistant_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                assistant_timestamp = datetime.now().isoformat(sep=" ", timespec="seconds")
                 
                 # Display response
                 if response and response.strip():
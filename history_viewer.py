@@ -4,6 +4,14 @@ from ncc_utils import (
     clear_history
 )
 
+HISTORY_PAGE_SIZE = 20  # Entries rendered by default; older ones only when asked for
+
+def _entries_to_show(entries, show_all_key):
+    """Most recent entries first, limited to HISTORY_PAGE_SIZE unless the user asks for all of them."""
+    if len(entries) > HISTORY_PAGE_SIZE and not st.checkbox(f"Show all {len(entries)} entries", key=show_all_key):
+        return entries[:-HISTORY_PAGE_SIZE - 1:-1]  # One reversed slice of just the recent entries
+    return reversed(entries)
+
 def show_history_viewer_full():
     try:
         st.markdown("""
@@ -70,7 +78,7 @@ def show_history_viewer_full():
                     if st.button("No, Keep Chat History", key="confirm_no_chat_hist"):
                         st.session_state.confirm_clear_chat = False
             if chat_history_data:
-                for i, entry in enumerate(reversed(chat_history_data)):
+                for i, entry in enumerate(_entries_to_show(chat_history_data, "show_all_chat_hist")):
                     timestamp = entry.get("timestamp", "Unknown time")
                     prompt = entry.get("prompt", "No prompt text")
                     response = entry.get("response", "No response text")
@@ -98,7 +106,7 @@ def show_history_viewer_full():
             st.download_button(
                 "⬇️ Download Quiz History",
                 read_history("quiz_log"),
-                "quiz_log.json",
+                "quiz_log.jsonl",
                 key="download_quiz_hist_main",
                 help="Save a copy of your quiz history to your computer"
             )
@@ -112,7 +120,7 @@ def show_history_viewer_full():
                     if st.button("No, Keep Quiz History", key="confirm_no_quiz"):
                         st.session_state.confirm_clear_quiz = False
             if quiz_history_data:
-                for i, quiz_log_entry in enumerate(reversed(quiz_history_data)):
+                for i, quiz_log_entry in enumerate(_entries_to_show(quiz_history_data, "show_all_quiz_hist")):
                     timestamp = quiz_log_entry.get("timestamp", "Unknown time")
                     topic = quiz_log_entry.get("topic", "Unknown Topic")
                     difficulty = quiz_log_entry.get("difficulty", "N/A")
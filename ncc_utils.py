@@ -12,6 +12,7 @@ import csv
 from dataclasses import dataclass
 from pathlib import Path
 import hashlib
+import logging
 
 # --- Configuration ---
 @dataclass
@@ -22,7 +23,7 @@ class Config:
     LOGS_DIR = os.path.join(BASE_DIR, "logs")
     os.makedirs(DATA_DIR, exist_ok=True)
     os.makedirs(LOGS_DIR, exist_ok=True)
-    QUIZ_SCORE_HISTORY_FILE = os.path.join(DATA_DIR, "quiz_score_history.json")
+    QUIZ_SCORE_HISTORY_FILE = os.path.join(DATA_DIR, "quiz_score_history.jsonl")
     APP_LOG_FILE = os.path.join(LOGS_DIR, "app.log")
     LOG_PATHS = {
         'chat': {
@@ -30,8 +31,8 @@ class Config:
             'transcript': os.path.join(DATA_DIR, "chat_transcript.txt")
         },
         'quiz': {
-            'log': os.path.join(DATA_DIR, "quiz_log.json"),
-            'scores': os.path.join(DATA_DIR, "quiz_score_history.json"),
+            'log': os.path.join(DATA_DIR, "quiz_log.jsonl"), # JSON Lines: one entry per line, append-only
+            'scores': os.path.join(DATA_DIR, "quiz_score_history.jsonl"), # JSON Lines, append-only
             'transcript': os.path.join(DATA_DIR, "quiz_transcript.txt"),
             'bookmarks': os.path.join(DATA_DIR, "quiz_bookmarks.json")
         },
@@ -75,15 +76,48 @@ def setup_gemini() -> Tuple[Optional[genai.GenerativeModel], Optional[str]]:
 
 # --- File Operations, Quiz, Chat, and Helpers ---
 
+JSONL_READ_BUFFER_SIZE = 128 * 1024 # Line-by-line reads of growing logs; the 8 KiB default means many small reads
+
 def read_json_file(file_path: str) -> Any:
     """Reads a JSON file and returns the content."""
     with open(file_path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
 def write_json_file(file_path: str, data: Any) -> None:
-    """Writes data to a JSON file."""
+    """Writes data to a JSON file (serialized in one pass, then written with a single call)."""
     with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+        f.write(json.dumps(data, ensure_ascii=False, indent=4))
+
+def read_jsonl_file(file_path: str) -> List[Any]:
+    """Reads a JSON Lines file (one JSON value per line) and returns the entries."""
+    with open(file_path, 'r', encoding='utf-8', buffering=JSONL_READ_BUFFER_SIZE) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def append_to_jsonl_file(file_path: str, data: Any) -> None:
+    """Appends one entry to a JSON Lines file without reading the existing entries."""
+    with open(file_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(data, ensure_ascii=False) + "\n")
+
+def migrate_json_to_jsonl(jsonl_path: str) -> None:
+    """
+    One-time upgrade for files that moved from a JSON array to JSON Lines: if jsonl_path is
+    missing but the legacy .json file beside it exists, rewrite its entries as JSON Lines and
+    remove it (so a later clear of the new file does not bring the old entries back).
+    """
+    legacy_path = os.path.splitext(jsonl_path)[0] + ".json"
+    if os.path.exists(jsonl_path) or not os.path.exists(legacy_path):
+        return
+    try:
+        entries = read_json_file(legacy_path)
+        if not isinstance(entries, list):
+            entries = [entries]
+        tmp_path = jsonl_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        os.replace(tmp_path, jsonl_path)
+        os.remove(legacy_path)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Could not convert {legacy_path} to JSON Lines: {e}")
 
 def append_to_json_file(file_path: str, data: Any) -> None:
     """Appends data to a JSON file."""
@@ -130,7 +164,7 @@ def log_quiz_event(event_type: str, details: Dict[str, Any]) -> None:
     """Logs a quiz event (e.g., start, end, question, answer) to the log file."""
     timestamp = datetime.now().isoformat()
     log_entry = {"timestamp": timestamp, "event_type": event_type, "details": details}
-    append_to_json_file(Config.LOG_PATHS['quiz']['log'], log_entry)
+    append_to_jsonl_file(Config.LOG_PATHS['quiz']['log'], log_entry)
 
 def get_chat_history() -> List[Dict[str, str]]:
     """Retrieves the chat history."""
@@ -138,11 +172,11 @@ def get_chat_history() -> List[Dict[str, str]]:
 
 def get_quiz_scores() -> List[Dict[str, Union[str, int]]]:
     """Retrieves the quiz scores."""
-    return read_json_file(Config.LOG_PATHS['quiz']['scores'])
+    return read_jsonl_file(Config.LOG_PATHS['quiz']['scores'])
 
 def get_quiz_log() -> List[Dict[str, Union[str, int]]]:
     """Retrieves the quiz log."""
-    return read_json_file(Config.LOG_PATHS['quiz']['log'])
+    return read_jsonl_file(Config.LOG_PATHS['quiz']['log'])
 
 def get_bookmarks() -> List[Dict[str, Union[str, int]]]:
     """Retrieves the bookmarks."""
@@ -320,55 +354,54 @@ def clear_history(file_type: str = "chat") -> bool:
                     os.remove(path)
                 except Exception:
                     success = False
+        _cached_read_history.clear() # Release the decoded copies of the removed files
         return success
     except Exception:
         return False
 
+@st.cache_data(ttl=300)
+def _cached_read_history(path: str, version: Tuple[int, int], json_lines: bool) -> List[Any]:
+    """Decodes a history file. version (mtime, size) is part of the cache key, so any write invalidates it."""
+    if json_lines:
+        return read_jsonl_file(path)
+    return read_json_file(path)
+
+def _read_history_file(path: str, json_lines: bool = False) -> List[Any]:
+    """Returns the decoded history at path (empty if missing), parsing it again only after it changes."""
+    try:
+        stat = os.stat(path)
+    except OSError: # Nothing saved yet
+        return []
+    return _cached_read_history(path, (stat.st_mtime_ns, stat.st_size), json_lines)
+
+def _read_text_file(path: str) -> str:
+    """Returns a whole text file in one read (no separate existence check), or "" if it is missing."""
+    try:
+        return Path(path).read_text(encoding='utf-8')
+    except FileNotFoundError:
+        return ""
+
 def read_history(file_type: str = "chat") -> Union[List[Dict], str]:
     """Read history for the specified type and return raw data.
     Args:
         file_type: Type of history to read ('chat', 'quiz', 'quiz_score', 'bookmark', 'chat_transcript', 'quiz_log')
     Returns:
         List[Dict]: List of history items for 'chat', 'quiz', 'bookmark'.
-        str: JSON string for 'quiz_score', or text content for 'chat_transcript', 'quiz_log' (as JSON string).
+        str: JSON string for 'quiz_score', or text content for 'chat_transcript', 'quiz_log' (as JSON Lines).
         Empty list or string if file not found or error occurs.
     """
     if file_type == "chat":
-        path = Config.LOG_PATHS['chat']['history']
-        if os.path.exists(path):
-            with open(path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
+        return _read_history_file(Config.LOG_PATHS['chat']['history'])
     if file_type == "quiz":
-        path = Config.LOG_PATHS['quiz']['log']
-        if os.path.exists(path):
-            with open(path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
+        return _read_history_file(Config.LOG_PATHS['quiz']['log'], json_lines=True)
     if file_type == "bookmark":
-        path = Config.LOG_PATHS['bookmark']['data']
-        if os.path.exists(path):
-            with open(path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
+        return _read_history_file(Config.LOG_PATHS['bookmark']['data'])
     if file_type == "chat_transcript":
-        path = Config.LOG_PATHS['chat']['transcript']
-        if os.path.exists(path):
-            with open(path, 'r', encoding='utf-8') as f:
-                return f.read()
-        return ""
+        return _read_text_file(Config.LOG_PATHS['chat']['transcript'])
     if file_type == "quiz_score":
-        path = Config.LOG_PATHS['quiz']['scores']
-        if os.path.exists(path):
-            with open(path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
+        return _read_history_file(Config.LOG_PATHS['quiz']['scores'], json_lines=True)
     if file_type == "quiz_log":
-        path = Config.LOG_PATHS['quiz']['log']
-        if os.path.exists(path):
-            with open(path, 'r', encoding='utf-8') as f:
-                return f.read()
-        return ""
+        return _read_text_file(Config.LOG_PATHS['quiz']['log'])
     return []
 
 # --- Hybrid read_history: merge local and Firestore data for chat/quiz/quiz_score ---
@@ -407,21 +440,16 @@ def hybrid_read_history(file_type: str = "chat"):
 
 globals()["read_history"] = hybrid_read_history
 
+migrate_json_to_jsonl(Config.LOG_PATHS['quiz']['scores']) # Score histories saved before the JSON Lines format
+migrate_json_to_jsonl(Config.LOG_PATHS['quiz']['log']) # Quiz logs saved before the JSON Lines format
+
 def load_quiz_score_history() -> List[Dict[str, Any]]:
-    """Loads quiz score history from its dedicated JSON file."""
-    path = Config.LOG_PATHS['quiz']['scores']
-    if os.path.exists(path):
-        with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
+    """Loads quiz score history from its dedicated JSON Lines file."""
+    return _read_history_file(Config.LOG_PATHS['quiz']['scores'], json_lines=True)
 
 def append_quiz_score_entry(entry: Dict[str, Any]) -> None:
-    """Appends a quiz score entry to the history and saves it to file."""
-    path = Config.LOG_PATHS['quiz']['scores']
-    history = load_quiz_score_history()
-    history.append(entry)
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(history, f, indent=2, ensure_ascii=False)
+    """Appends a quiz score entry to the history file (one line; earlier entries are not rewritten)."""
+    append_to_jsonl_file(Config.LOG_PATHS['quiz']['scores'], entry)
 
 def clear_quiz_score_history() -> bool:
     """Clears the quiz score history file."""
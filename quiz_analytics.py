@@ -7,10 +7,26 @@ import json
 import os
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from collections import defaultdict, Counter
+from functools import lru_cache
+
+@lru_cache(maxsize=1024) # History timestamps never change, so each string is parsed once per process
+def _parse_timestamp(timestamp: str) -> Optional[datetime]:
+    """Parses a history timestamp (ISO or 'YYYY-MM-DD HH:MM:SS'), returning None if it is malformed."""
+    try:
+        return datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return None
+
+def _entry_accuracy(entry: Dict) -> float:
+    """Percentage score of one history entry; entries without total_questions already store a percentage."""
+    if 'total_questions' not in entry:
+        return entry.get('score', 0)
+    return entry.get('score', 0) / max(entry['total_questions'], 1) * 100
 
 class QuizAnalytics:
     """Comprehensive quiz analytics and performance tracking"""
@@ -40,7 +56,15 @@ class QuizAnalytics:
         total_correct = sum(entry.get('score', 0) for entry in quiz_history)
         total_time = sum(entry.get('time_taken', 0) for entry in quiz_history)
         
-        average_score = (total_correct / total_questions * 100) if total_questions > 0 else 0
+        # Per-quiz success percentage, computed once for the average, streaks and trend
+        succ_pct = np.fromiter(
+            (_entry_accuracy(entry) for entry in quiz_history), dtype=float, count=total_quizzes
+        )
+        
+        if all('total_questions' in entry for entry in quiz_history):
+            average_score = (total_correct / total_questions * 100) if total_questions > 0 else 0
+        else:
+            average_score = float(succ_pct.mean())  # Saved history stores only a percentage per quiz
         accuracy_rate = average_score
         average_time_per_question = (total_time / total_questions) if total_questions > 0 else 0
         
@@ -49,8 +73,7 @@ class QuizAnalytics:
         best_streak = 0
         temp_streak = 0
         
-        for entry in reversed(quiz_history):  # Start from most recent
-            score_percentage = (entry.get('score', 0) / max(entry.get('total_questions', 1), 1)) * 100
+        for score_percentage in succ_pct[::-1]:  # Start from most recent
             if score_percentage >= 70:  # 70% threshold for success
                 temp_streak += 1
                 if current_streak == 0:  # Still counting current streak
@@ -64,14 +87,11 @@ class QuizAnalytics:
         best_streak = max(best_streak, temp_streak)
         
         # Improvement trend
-        if len(quiz_history) >= 3:
-            recent_scores = [
-                (entry.get('score', 0) / max(entry.get('total_questions', 1), 1)) * 100 
-                for entry in quiz_history[-3:]
-            ]
-            if recent_scores[-1] > recent_scores[0]:
+        if len(succ_pct) >= 3:
+            delta = succ_pct[-1] - succ_pct[-3]
+            if delta > 0:
                 improvement_trend = "Improving"
-            elif recent_scores[-1] < recent_scores[0]:
+            elif delta < 0:
                 improvement_trend = "Declining"
             else:
                 improvement_trend = "Stable"
@@ -165,20 +185,14 @@ class QuizAnalytics:
         
         recent_quizzes = []
         for entry in quiz_history:
-            try:
-                quiz_date = datetime.strptime(entry.get('timestamp', ''), '%Y-%m-%d %H:%M:%S')
-                if quiz_date >= week_ago:
-                    recent_quizzes.append(entry)
-            except:
-                continue
+            quiz_date = _parse_timestamp(entry.get('timestamp', ''))
+            if quiz_date and quiz_date >= week_ago:
+                recent_quizzes.append(entry)
         
         if not recent_quizzes:
             return "No recent activity"
         
-        recent_accuracy = sum(
-            (entry.get('score', 0) / max(entry.get('total_questions', 1), 1)) * 100 
-            for entry in recent_quizzes
-        ) / len(recent_quizzes)
+        recent_accuracy = sum(_entry_accuracy(entry) for entry in recent_quizzes) / len(recent_quizzes)
         
         if recent_accuracy >= 80:
             return f"Excellent ({len(recent_quizzes)} quizzes, {recent_accuracy:.1f}% avg)"
@@ -187,6 +201,12 @@ class QuizAnalytics:
         else:
             return f"Needs improvement ({len(recent_quizzes)} quizzes, {recent_accuracy:.1f}% avg)"
 
+# (name, stats key, target, icon, description) for goals shown in the dashboard
+_NEXT_ACHIEVEMENTS = (
+    ("Quiz Master", "total_quizzes", 10, "👑", "Complete {remaining} more quizzes"),
+    ("Hot Streak", "streak_best", 5, "🔥", "Win {remaining} more quizzes in a row to reach a 5 quiz streak"),
+)
+
 class GamificationSystem:
     """Gamification features for quiz engagement"""
     
@@ -202,7 +222,7 @@ class GamificationSystem:
             "description": "Get 100% on any quiz",
             "icon": "🎯",
             "requirement": lambda stats: any(
-                entry.get('score', 0) == entry.get('total_questions', 0) 
+                _entry_accuracy(entry) >= 100
                 for entry in st.session_state.get('quiz_ss_quiz_score_history', [])
             )
         },
@@ -254,26 +274,16 @@ class GamificationSystem:
     @staticmethod
     def get_next_achievements(stats: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Get next achievements to work towards"""
-        next_achievements = []
-        
-        # Logic to suggest next achievements based on current progress
-        if stats["total_quizzes"] < 10:
-            next_achievements.append({
-                "name": "Quiz Master",
-                "description": f"Complete {10 - stats['total_quizzes']} more quizzes",
-                "icon": "👑",
-                "progress": (stats["total_quizzes"] / 10) * 100
-            })
-        
-        if stats["streak_best"] < 5:
-            next_achievements.append({
-                "name": "Hot Streak",
-                "description": f"Build a {5 - stats['streak_current']} quiz winning streak",
-                "icon": "🔥",
-                "progress": (stats["streak_current"] / 5) * 100
-            })
-        
-        return next_achievements
+        return [
+            {
+                "name": name,
+                "description": description.format(remaining=target - stats[stat_key]),
+                "icon": icon,
+                "progress": min(stats[stat_key] / target * 100, 100)
+            }
+            for name, stat_key, target, icon, description in _NEXT_ACHIEVEMENTS
+            if stats[stat_key] < target
+        ]
 
 def show_quiz_analytics_dashboard():
     """Display comprehensive quiz analytics dashboard"""
@@ -331,13 +341,12 @@ def show_quiz_analytics_dashboard():
         scores = []
         
         for entry in quiz_history:
-            try:
-                date = datetime.strptime(entry.get('timestamp', ''), '%Y-%m-%d %H:%M:%S')
-                dates.append(date)
-                accuracy = (entry.get('score', 0) / max(entry.get('total_questions', 1), 1)) * 100
-                scores.append(accuracy)
-            except:
+            date = _parse_timestamp(entry.get('timestamp', ''))
+            if date is None:
                 continue
+            dates.append(date)
+            accuracy = _entry_accuracy(entry)
+            scores.append(accuracy)
         
         if dates and scores:
             # Create performance trend chart
@@ -429,7 +438,8 @@ def show_detailed_quiz_history():
     
     with col2:
         # Difficulty filter
-        difficulties = list(set(entry.get('difficulty', 'Medium') for entry in quiz_history))
+        # dict.fromkeys keeps first-seen order, so the dropdown is stable across reruns
+        difficulties = list(dict.fromkeys(entry.get('difficulty', 'Medium') for entry in quiz_history))
         difficulty_filter = st.selectbox("Difficulty", ["All"] + difficulties)
     
     with col3:
@@ -448,7 +458,7 @@ def show_detailed_quiz_history():
         cutoff_date = datetime.now() - timedelta(days=days)
         filtered_history = [
             entry for entry in filtered_history
-            if datetime.strptime(entry.get('timestamp', ''), '%Y-%m-%d %H:%M:%S') >= cutoff_date
+            if (quiz_date := _parse_timestamp(entry.get('timestamp', ''))) and quiz_date >= cutoff_date
         ]
     
     # Apply difficulty filter
@@ -461,7 +471,7 @@ def show_detailed_quiz_history():
     # Apply score filter
     if score_filter != "All":
         for entry in filtered_history:
-            accuracy = (entry.get('score', 0) / max(entry.get('total_questions', 1), 1)) * 100
+            accuracy = _entry_accuracy(entry)
             if score_filter == "Excellent (80%+)" and accuracy < 80:
                 filtered_history.remove(entry)
             elif score_filter == "Good (60-79%)" and (accuracy < 60 or accuracy >= 80):
@@ -471,12 +481,25 @@ def show_detailed_quiz_history():
     
     st.markdown(f"**Showing {len(filtered_history)} of {len(quiz_history)} quizzes**")
     
-    # Display filtered history
-    for i, entry in enumerate(reversed(filtered_history)):
+    # Display filtered history, most recent first, one page at a time so render
+    # cost stays constant as the history grows
+    page_size = 10
+    n = len(filtered_history)
+    page_count = max((n + page_size - 1) // page_size, 1)
+    page = 0
+    if page_count > 1:
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1, key="quiz_history_page") - 1
+    start = page * page_size
+    page_entries = filtered_history[max(n - start - page_size, 0):n - start][::-1]
+    # Filters keep the history's own entry objects, so each maps back to its position in the full history
+    history_index = {id(entry): index for index, entry in enumerate(quiz_history)}
+    
+    for entry in page_entries:
+        index = history_index[id(entry)]
         timestamp = entry.get('timestamp', 'Unknown')
         score = entry.get('score', 0)
         total = entry.get('total_questions', 0)
-        accuracy = (score / max(total, 1)) * 100
+        accuracy = _entry_accuracy(entry)
         difficulty = entry.get('difficulty', 'Medium')
         time_taken = entry.get('time_taken', 0)
         
@@ -488,32 +511,40 @@ def show_detailed_quiz_history():
         else:
             color = "🔴"
         
-        with st.expander(f"{color} Quiz #{len(quiz_history) - i} - {timestamp} - {accuracy:.1f}%"):
-            col1, col2, col3, col4 = st.columns(4)
+        # Collapsed expander bodies still execute on every rerun, so details are only
+        # built for entries the user has switched open
+        quiz_number = index + 1
+        # Keyed on the entry's timestamp and its index in the full history, not its place on the page,
+        # so an open panel stays with its quiz across filters and pages, and two quizzes saved with
+        # the same timestamp still get distinct widget keys
+        details_key = f"quiz_history_details_{entry.get('timestamp')}_{index}"
+        if st.toggle(f"{color} Quiz #{quiz_number} - {timestamp} - {accuracy:.1f}%", key=details_key):
+            with st.container():
+                col1, col2, col3, col4 = st.columns(4)
             
-            with col1:
-                st.metric("Score", f"{score}/{total}")
-            with col2:
-                st.metric("Accuracy", f"{accuracy:.1f}%")
-            with col3:
-                st.metric("Difficulty", difficulty)
-            with col4:
-                st.metric("Time", f"{time_taken:.0f}s")
+                with col1:
+                    st.metric("Score", f"{score}/{total}" if total else f"{score:.1f}%")
+                with col2:
+                    st.metric("Accuracy", f"{accuracy:.1f}%")
+                with col3:
+                    st.metric("Difficulty", difficulty)
+                with col4:
+                    st.metric("Time", f"{time_taken:.0f}s")
             
-            # Show questions if available
-            questions = entry.get('questions', [])
-            if questions:
-                st.markdown("**Questions:**")
-                for j, q in enumerate(questions, 1):
-                    user_answer = q.get('user_answer', 'Not answered')
-                    correct_answer = q.get('correct_answer', 'Unknown')
-                    is_correct = q.get('is_correct', False)
+                # Show questions if available
+                questions = entry.get('questions', [])
+                if questions:
+                    st.markdown("**Questions:**")
+                    for j, q in enumerate(questions, 1):
+                        user_answer = q.get('user_answer', 'Not answered')
+                        correct_answer = q.get('correct_answer', 'Unknown')
+                        is_correct = q.get('is_correct', False)
                     
-                    status = "✅" if is_correct else "❌"
-                    st.markdown(f"{status} **Q{j}:** {q.get('question', 'Question not available')}")
-                    st.markdown(f"   Your answer: {user_answer}")
-                    if not is_correct:
-                        st.markdown(f"   Correct answer: {correct_answer}")
+                        status = "✅" if is_correct else "❌"
+                        st.markdown(f"{status} **Q{j}:** {q.get('question', 'Question not available')}")
+                        st.markdown(f"   Your answer: {user_answer}")
+                        if not is_correct:
+                            st.markdown(f"   Correct answer: {correct_answer}")
 
 def create_quiz_performance_summary():
     """Create a compact performance summary widget"""
@@ -0,0 +1,155 @@
+"""
+Quiz Question Cache for NCC ABYAS
+Persists pools of AI-generated questions per topic and difficulty so quizzes can be
+drawn from a pool instead of calling Gemini for every quiz
+"""
+import os
+import gzip
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import orjson
+import logging
+from contextlib import closing
+from functools import lru_cache
+from typing import List, Dict, Any, Optional
+
+from ncc_utils import Config
+
+QUIZ_CACHE_DB = os.path.join(Config.DATA_DIR, "quiz_cache.db")
+QUIZ_CACHE_TTL_SECONDS = 7 * 24 * 3600  # Serve cached question pools for a week
+QUIZ_POOL_SIZE = 10  # Questions generated per pool; matches the largest quiz the UI offers
+QUIZ_POOL_MAX = 50  # Cap on a pool grown by extend(); the oldest questions are dropped past it
+
+
+def _connect() -> sqlite3.Connection:
+    """Opens the cache database, creating the table on first use."""
+    conn = sqlite3.connect(QUIZ_CACHE_DB)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS quiz_cache ("
+        "key TEXT PRIMARY KEY, questions_json BLOB NOT NULL, created_at INTEGER NOT NULL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS user_seen ("
+        "user_id TEXT NOT NULL, question_hash TEXT NOT NULL, PRIMARY KEY (user_id, question_hash))"
+    )
+    return conn
+
+
+@lru_cache(maxsize=64) # Topics x difficulties is a small fixed set
+def make_key(topic: str, difficulty: str) -> str:
+    """Builds a stable cache key for a question pool."""
+    payload = json.dumps({"topic": topic, "difficulty": difficulty}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _encode(questions: List[Dict[str, Any]]) -> bytes:
+    """Serializes a pool compactly; level-1 gzip shrinks JSON several-fold for little CPU."""
+    return gzip.compress(orjson.dumps(questions, option=orjson.OPT_NON_STR_KEYS), compresslevel=1)
+
+
+def get(key: str) -> Optional[List[Dict[str, Any]]]:
+    """Returns the cached question pool for key, or None on a miss or expired entry."""
+    try:
+        with closing(_connect()) as conn:
+            row = conn.execute(
+                "SELECT questions_json, created_at FROM quiz_cache WHERE key = ?", (key,)
+            ).fetchone()
+    except sqlite3.Error as e:
+        logging.warning(f"Quiz cache read failed: {e}")
+        return None
+
+    if not row or time.time() - row[1] > QUIZ_CACHE_TTL_SECONDS:
+        return None
+    try:
+        return orjson.loads(gzip.decompress(row[0]))
+    except (OSError, EOFError, orjson.JSONDecodeError):  # Corrupt or truncated entry
+        return None
+
+
+def version(key: str) -> Optional[int]:
+    """Returns when the pool under key was stored, or None on a miss or expired entry (no decoding)."""
+    try:
+        with closing(_connect()) as conn:
+            row = conn.execute("SELECT created_at FROM quiz_cache WHERE key = ?", (key,)).fetchone()
+    except sqlite3.Error as e:
+        logging.warning(f"Quiz cache read failed: {e}")
+        return None
+    if not row or time.time() - row[0] > QUIZ_CACHE_TTL_SECONDS:
+        return None
+    return row[0]
+
+
+def put(key: str, questions: List[Dict[str, Any]]) -> None:
+    """Stores a question pool under key, replacing any previous entry."""
+    try:
+        with closing(_connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO quiz_cache (key, questions_json, created_at) VALUES (?, ?, ?)",
+                (key, _encode(questions), int(time.time()))
+            )
+    except sqlite3.Error as e:
+        logging.warning(f"Quiz cache write failed: {e}")
+
+
+def question_hash(question: Dict[str, Any]) -> str:
+    """Identifies a question by its text, independent of where it is stored (reusing a stored _id)."""
+    return question.get("_id") or hashlib.sha256(question.get("question", "").encode()).hexdigest()
+
+
+def extend(key: str, questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Adds newly generated questions to the pool under key (skipping duplicates) and returns the stored pool."""
+    pool = get(key) or []
+    known = {question_hash(q) for q in pool}
+    pool += [q for q in questions if question_hash(q) not in known]
+    pool = pool[-QUIZ_POOL_MAX:]
+    put(key, pool)
+    return pool
+
+
+def _seen_hashes(conn: sqlite3.Connection, user_id: str) -> set:
+    return {row[0] for row in conn.execute("SELECT question_hash FROM user_seen WHERE user_id = ?", (user_id,))}
+
+
+def unseen_count(pool: List[Dict[str, Any]], user_id: Optional[str] = None) -> int:
+    """Counts the questions in pool the user has not been shown yet (the whole pool for a guest)."""
+    if not user_id:
+        return len(pool)
+    try:
+        with closing(_connect()) as conn:
+            seen = _seen_hashes(conn, user_id)
+    except sqlite3.Error as e:
+        logging.warning(f"Quiz seen-question tracking failed: {e}")
+        return len(pool)
+    return sum(question_hash(q) not in seen for q in pool)
+
+
+def draw(pool: List[Dict[str, Any]], num_questions: int, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Randomly draws num_questions from pool. For a signed-in user, questions they
+    have not seen yet are drawn first; seen ones only fill the remainder.
+    """
+    num_questions = min(num_questions, len(pool))
+    if not user_id:
+        return [pool[i] for i in random.sample(range(len(pool)), num_questions)]
+
+    hashes = [question_hash(q) for q in pool]
+    try:
+        with closing(_connect()) as conn, conn:
+            seen = _seen_hashes(conn, user_id)
+            # Partition pool indices in one pass; only indices are sampled, never the questions
+            unseen_idx, seen_idx = [], []
+            for i, h in enumerate(hashes):
+                (seen_idx if h in seen else unseen_idx).append(i)
+            chosen = random.sample(unseen_idx, min(num_questions, len(unseen_idx)))
+            chosen += random.sample(seen_idx, num_questions - len(chosen))
+            conn.executemany(
+                "INSERT OR IGNORE INTO user_seen (user_id, question_hash) VALUES (?, ?)",
+                [(user_id, hashes[i]) for i in chosen]
+            )
+    except sqlite3.Error as e:
+        logging.warning(f"Quiz seen-question tracking failed: {e}")
+        chosen = random.sample(range(len(pool)), num_questions)
+    return [pool[i] for i in chosen]
@@ -1,10 +1,12 @@
 import streamlit as st
-import random
+import html
+import hashlib
 import time
-import os
-import json
+from array import array
+import orjson
 import re
-from typing import List, Dict, Any, Optional, Tuple
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 from datetime import datetime # Ensure datetime is imported
 import google.generativeai as genai
 
@@ -20,9 +22,9 @@ from core_utils import (
     _cooldown_message
 )
 
-from sync_manager import queue_for_sync
-from security import SecurityValidator, secure_quiz_input
-from mobile_ui import show_loading_state, create_quiz_question_card
+from sync_manager import queue_for_sync_background
+import quiz_cache
+from mobile_ui import create_quiz_question_card
 # Import quiz analytics
 from quiz_analytics import (
     show_quiz_analytics_dashboard, 
@@ -37,39 +39,94 @@ from gamification import award_xp, show_xp_notification
 
 # --- Quiz State Management ---
 SS_PREFIX = "quiz_ss_" # Prefix to avoid conflicts with other modules' session state
+# Session-state keys, built once here rather than formatted on every access
+_K_QUIZ_ACTIVE = f"{SS_PREFIX}quiz_active"
+_K_CURRENT_QUESTION_INDEX = f"{SS_PREFIX}current_question_index"
+_K_QUIZ_QUESTIONS = f"{SS_PREFIX}quiz_questions"
+_K_QUIZ_ANSWER_KEYS = f"{SS_PREFIX}quiz_answer_keys"
+_K_USER_ANSWERS = f"{SS_PREFIX}user_answers"
+_K_QUIZ_START_TIME = f"{SS_PREFIX}quiz_start_time"
+_K_QUIZ_END_TIME = f"{SS_PREFIX}quiz_end_time"
+_K_QUIZ_START_MONO = f"{SS_PREFIX}quiz_start_mono"
+_K_QUIZ_SUBMITTED = f"{SS_PREFIX}quiz_submitted"
+_K_QUIZ_RESULT = f"{SS_PREFIX}quiz_result"
+_K_QUIZ_BOOKMARKS = f"{SS_PREFIX}quiz_bookmarks"
+_K_QUIZ_HEADING = f"{SS_PREFIX}quiz_heading"
+_K_CURRENT_QUIZ_TOPIC = f"{SS_PREFIX}current_quiz_topic"
+_K_CURRENT_QUIZ_DIFFICULTY = f"{SS_PREFIX}current_quiz_difficulty"
+_K_QUIZ_SCORE_HISTORY = f"{SS_PREFIX}quiz_score_history"
+_K_STATE_CHECKED = f"{SS_PREFIX}state_checked"
+_K_LAST_QUIZ_API_CALL_TIME = f"{SS_PREFIX}last_quiz_api_call_time"
 
 # --- Quiz Generation Constants (can be moved to a local config if needed) ---
 TEMP_QUIZ = 0.5 # Slightly higher for more creative questions
 MAX_TOKENS_QUIZ = 2500 # Increased for potentially more questions or detailed explanations
+QUIZ_GENERATION_CONFIG = genai.GenerationConfig(temperature=TEMP_QUIZ, max_output_tokens=MAX_TOKENS_QUIZ)
+
+DIFFICULTY_LEVELS = ("Easy", "Medium", "Hard")
+# TODO: Consider dynamically populating topics from syllabus_manager or a predefined list for AI.
+AI_QUIZ_TOPICS = (
+    "NCC General", "National Integration", "Drill", "Weapon Training", 
+    "Map Reading", "Field Craft Battle Craft", "Civil Defence", 
+    "First Aid", "Leadership", "Social Service"
+)
+
+# st.fragment reruns only the decorated block on its own widget events (older Streamlit
+# ships it as experimental_fragment; without either, fall back to plain functions)
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
+# Session-state entries holding the current quiz's data (everything else is small flags/settings)
+_QUIZ_DATA_KEYS = (_K_QUIZ_QUESTIONS, _K_QUIZ_ANSWER_KEYS, _K_USER_ANSWERS, _K_QUIZ_RESULT, _K_QUIZ_BOOKMARKS, _K_QUIZ_HEADING)
 
 
 def _initialize_quiz_state(ss):
     """Initializes all quiz-related session state variables if they don't exist."""
-    if f"{SS_PREFIX}quiz_active" not in ss:
-        # Load persisted score history first, then reset other quiz state
-        # Ensure quiz_score_history is initialized before _reset_quiz_state might use it
-        if f"{SS_PREFIX}quiz_score_history" not in ss:
-            ss[f"{SS_PREFIX}quiz_score_history"] = load_quiz_score_history()
-        _reset_quiz_state(ss) # Resets current quiz, uses loaded history for difficulty
+    if _K_QUIZ_ACTIVE not in ss:
+        # Load persisted score history first, then fill in the other quiz state
+        # Ensure quiz_score_history is initialized before the defaults use it for difficulty
+        if _K_QUIZ_SCORE_HISTORY not in ss: # Only read the file when the history is not loaded yet
+            ss[_K_QUIZ_SCORE_HISTORY] = load_quiz_score_history()
+        # A fresh session has no old quiz to drop, so only fill missing keys (no _reset_quiz_state)
+        for key, value in _default_quiz_state(ss).items():
+            ss.setdefault(key, value)
+        ss[_K_STATE_CHECKED] = True
+        return
+    if ss.get(_K_STATE_CHECKED):
+        return # Shape of existing state already checked once this session; skip on every rerun
+    ss[_K_STATE_CHECKED] = True
+    # Only a dev-mode hot reload carries session state across a code change; a quiz whose state
+    # is not in the current shape is simply started over rather than converted
+    answers = ss.get(_K_USER_ANSWERS)
+    if not (isinstance(answers, array) and len(answers) == len(ss.get(_K_QUIZ_QUESTIONS) or [])
+            and isinstance(ss.get(_K_QUIZ_BOOKMARKS), dict) and all(key in ss for key in _default_quiz_state(ss))):
+        _reset_quiz_state(ss)
+
+def _default_quiz_state(ss) -> Dict[str, Any]:
+    """Fresh initial values for the per-quiz session state (new containers on every call)."""
+    return {
+        _K_QUIZ_ACTIVE: False,
+        _K_CURRENT_QUESTION_INDEX: 0,
+        _K_QUIZ_QUESTIONS: [],
+        _K_QUIZ_ANSWER_KEYS: [], # Correct answer key per question, parallel to quiz_questions
+        _K_USER_ANSWERS: array('b'), # Selected option index per question (-1 until answered)
+        _K_QUIZ_START_TIME: None,
+        _K_QUIZ_END_TIME: None,
+        _K_QUIZ_START_MONO: None, # time.monotonic() at quiz start, for the duration
+        _K_QUIZ_SUBMITTED: False,
+        _K_QUIZ_RESULT: None,
+        _K_QUIZ_BOOKMARKS: {}, # Clear bookmarks on new quiz; question id -> question, in bookmark order
+        _K_CURRENT_QUIZ_TOPIC: "General Knowledge", # Default topic for new quizzes
+        # FIX: Resetting Difficulty on "New Quiz" - Recalc from history instead of hard-coding "Medium"
+        # (get_difficulty_level returns "Medium" when there is no history)
+        _K_CURRENT_QUIZ_DIFFICULTY: get_difficulty_level(ss.get(_K_QUIZ_SCORE_HISTORY) or []),
+    }
 
 def _reset_quiz_state(ss):
     """Resets the quiz to its initial state, clearing current quiz data."""
-    ss[f"{SS_PREFIX}quiz_active"] = False
-    ss[f"{SS_PREFIX}current_question_index"] = 0
-    ss[f"{SS_PREFIX}quiz_questions"] = []
-    ss[f"{SS_PREFIX}user_answers"] = {}
-    ss[f"{SS_PREFIX}quiz_start_time"] = None
-    ss[f"{SS_PREFIX}quiz_end_time"] = None
-    ss[f"{SS_PREFIX}quiz_submitted"] = False
-    ss[f"{SS_PREFIX}quiz_result"] = None
-    ss[f"{SS_PREFIX}quiz_bookmarks"] = [] # Clear bookmarks on new quiz
-    ss[f"{SS_PREFIX}current_quiz_topic"] = "General Knowledge" # Default topic for new quizzes
-    
-    # FIX: Resetting Difficulty on "New Quiz" - Recalc from history instead of hard-coding "Medium"
-    if f"{SS_PREFIX}quiz_score_history" in ss and ss[f"{SS_PREFIX}quiz_score_history"]:
-        ss[f"{SS_PREFIX}current_quiz_difficulty"] = get_difficulty_level(ss[f"{SS_PREFIX}quiz_score_history"])
-    else:
-        ss[f"{SS_PREFIX}current_quiz_difficulty"] = "Medium" # Default if no history
+    # Drop the finished quiz's questions, answers and result before creating the empty defaults
+    for key in _QUIZ_DATA_KEYS:
+        ss.pop(key, None)
+    ss.update(_default_quiz_state(ss))
 
 
 def get_difficulty_level(score_history: List[Dict[str, Any]]) -> str:
@@ -84,28 +141,17 @@ def get_difficulty_level(score_history: List[Dict[str, Any]]) -> str:
     if not score_history:
         return "Medium"
 
-    recent_scores_data = score_history[-5:]
-    
-    # Extract valid, numeric scores from recent history
-    valid_numeric_scores_recent = []
-    for entry in recent_scores_data:
-        score = entry.get('score') # Use .get() for safety against missing key
-        if isinstance(score, (int, float)): # Ensure score is numeric
-            valid_numeric_scores_recent.append(score)
-
-    if not valid_numeric_scores_recent:
-        # If no valid scores in recent history, try to use overall average from all history
-        all_valid_numeric_scores = []
-        for entry in score_history: # Check all history
-            score = entry.get('score')
-            if isinstance(score, (int, float)):
-                all_valid_numeric_scores.append(score)
-        
-        if not all_valid_numeric_scores:
-            return "Medium" # Default if absolutely no valid scores anywhere
-        average_score = sum(all_valid_numeric_scores) / len(all_valid_numeric_scores)
-    else:
-        average_score = sum(valid_numeric_scores_recent) / len(valid_numeric_scores_recent)
+    # Numeric scores from the last five entries, falling back to all history if there are none
+    scores = tuple(s for e in score_history[-5:] if isinstance((s := e.get('score')), (int, float)))
+    scores = scores or tuple(s for e in score_history if isinstance((s := e.get('score')), (int, float)))
+    return _difficulty_from_scores(scores)
+
+@lru_cache(maxsize=256) # Keyed on the scores themselves, so any session's history maps to the right result
+def _difficulty_from_scores(scores: Tuple[float, ...]) -> str:
+    """Maps the average of the given scores to a difficulty."""
+    if not scores:
+        return "Medium" # Default if absolutely no valid scores anywhere
+    average_score = sum(scores) / len(scores)
 
     # Adaptive logic based on average score
     if average_score >= 80:
@@ -115,20 +161,10 @@ def get_difficulty_level(score_history: List[Dict[str, Any]]) -> str:
     else:
         return "Easy"
 
-def _build_quiz_prompt(topic: str, num_q: int, difficulty: str) -> str:
-    """
-    Builds an enhanced Gemini prompt for quiz generation.
-    """
-    difficulty_instructions = {
-        "Easy": "focus on basic concepts, definitions, and straightforward facts. Questions should be simple to understand.",
-        "Medium": "require understanding of intermediate concepts, some application of knowledge, and ability to differentiate between related ideas. Distractors should be plausible.",
-        "Hard": "demand advanced understanding, critical thinking, analysis, or synthesis of information. Questions can be multi-step or scenario-based. Distractors should be very subtle."
-    }
-    
-    prompt = f"""
-    You are an expert NCC (National Cadet Corps) instructor. Your task is to generate {num_q} high-quality multiple-choice questions (MCQs) about the NCC topic: "{topic}".
-    The target audience is NCC cadets.
-    The desired difficulty level is: {difficulty.upper()}. For this difficulty, {difficulty_instructions.get(difficulty, difficulty_instructions['Medium'])}
+# Invariant instructions sent at the start of every quiz prompt. Keeping them as a
+# fixed prefix (with per-request details appended after) lets the model cache it.
+QUIZ_PROMPT_STATIC = """
+    You are an expert NCC (National Cadet Corps) instructor generating high-quality multiple-choice questions (MCQs) for NCC cadets.
 
     For each question, strictly adhere to the following format:
 
@@ -144,124 +180,206 @@ def _build_quiz_prompt(topic: str, num_q: int, difficulty: str) -> str:
     [This '---' separator MUST be on its own line between each complete question block (Q, Options, Answer, Explanation)]
 
     Important Guidelines:
-    1.  Number of Questions: Generate exactly {num_q} questions.
-    2.  Format Adherence: The specified format (Q:, A), B), C), D), ANSWER:, EXPLANATION:, ---) is CRITICAL for parsing. Do not deviate.
-    3.  Options: Provide exactly four unique options (A, B, C, D). Avoid "All of the above" or "None of the above". Distractors should be relevant to the topic.
-    4.  Answer: Clearly indicate the single correct answer using the format "ANSWER: [Letter]".
-    5.  Explanation: The explanation is crucial for learning. Make it informative.
-    6.  Relevance: All questions, options, and explanations must be directly related to NCC.
-    7.  Clarity: Ensure questions are well-phrased and easy to understand for NCC cadets.
-    8.  Originality: Generate fresh questions, not just copied from standard texts if possible, while staying true to NCC doctrine.
+    1.  Format Adherence: The specified format (Q:, A), B), C), D), ANSWER:, EXPLANATION:, ---) is CRITICAL for parsing. Do not deviate.
+    2.  Options: Provide exactly four unique options (A, B, C, D). Avoid "All of the above" or "None of the above". Distractors should be relevant to the topic.
+    3.  Answer: Clearly indicate the single correct answer using the format "ANSWER: [Letter]".
+    4.  Explanation: The explanation is crucial for learning. Make it informative.
+    5.  Relevance: All questions, options, and explanations must be directly related to NCC.
+    6.  Clarity: Ensure questions are well-phrased and easy to understand for NCC cadets.
+    7.  Originality: Generate fresh questions, not just copied from standard texts if possible, while staying true to NCC doctrine.
     """
-    return prompt
 
-def _parse_ai_quiz_response(response_text: str) -> List[Dict[str, Any]]:
-    """Parse raw quiz response from AI into structured format."""
-    parsed_questions = []
-    # Split by "---" which should be the primary separator between full question blocks
-    question_blocks = response_text.strip().split("\n---\n")
+DIFFICULTY_INSTRUCTIONS = {
+    "Easy": "focus on basic concepts, definitions, and straightforward facts. Questions should be simple to understand.",
+    "Medium": "require understanding of intermediate concepts, some application of knowledge, and ability to differentiate between related ideas. Distractors should be plausible.",
+    "Hard": "demand advanced understanding, critical thinking, analysis, or synthesis of information. Questions can be multi-step or scenario-based. Distractors should be very subtle."
+}
 
-    q_re = re.compile(r'Q:\s*(.*)', re.IGNORECASE) # Removed re.DOTALL
-    opt_re = re.compile(r'([A-D])\)\s*(.*)')
-    ans_re = re.compile(r'ANSWER:\s*([A-D])', re.IGNORECASE)
-    exp_re = re.compile(r'EXPLANATION:\s*(.*)', re.IGNORECASE | re.DOTALL)
+def _difficulty_prompt_line(difficulty: str) -> str:
+    """Prompt line describing the requested difficulty (unknown levels use Medium's instructions)."""
+    instructions = DIFFICULTY_INSTRUCTIONS.get(difficulty, DIFFICULTY_INSTRUCTIONS['Medium'])
+    return f"\n    The desired difficulty level is: {difficulty.upper()}. For this difficulty, {instructions}\n    "
 
-    for block in question_blocks:
-        block = block.strip()
-        if not block:
-            continue
+# Built once at import for the known levels
+_DIFFICULTY_PROMPT_LINES = {level: _difficulty_prompt_line(level) for level in DIFFICULTY_LEVELS}
 
-        question_data = {"question": "", "options": {}, "answer": "", "explanation": ""}
-        
-        # Extract question
-        q_match = q_re.search(block)
-        if q_match:
-            question_data["question"] = q_match.group(1).strip()
-
-        # Extract options
-        current_options_text = block
-        if q_match: # Remove question part to avoid re-matching options in question
-            current_options_text = block[q_match.end():]
-        
-        for opt_match in opt_re.finditer(current_options_text):
-            question_data["options"][opt_match.group(1)] = opt_match.group(2).strip()
-
-        # Extract answer
-        ans_match = ans_re.search(block)
-        if ans_match:
-            question_data["answer"] = ans_match.group(1).upper()
-
-        # Extract explanation
-        exp_match = exp_re.search(block)
-        if exp_match:
-            question_data["explanation"] = exp_match.group(1).strip()
-
-        # Validate extracted data for this block
-        if (question_data["question"] and
-            len(question_data["options"]) == 4 and
-            question_data["answer"] in question_data["options"] and # Check if answer key exists in options
-            question_data["explanation"]):
-            question_data["timestamp"] = datetime.now().isoformat()
+@lru_cache(maxsize=128) # Pure function of its arguments; repeat quizzes reuse the prompt
+def _build_quiz_prompt(topic: str, num_q: int, difficulty: str) -> str:
+    """
+    Builds an enhanced Gemini prompt for quiz generation.
+    """
+    difficulty_line = _DIFFICULTY_PROMPT_LINES.get(difficulty) or _difficulty_prompt_line(difficulty)
+    return f'{QUIZ_PROMPT_STATIC}\n    Your task is to generate exactly {num_q} questions about the NCC topic: "{topic}".{difficulty_line}'
+
+def _is_valid_question(question_data: Dict[str, Any]) -> bool:
+    """
+    Checks a question has text, four string options, an answer among them and an explanation.
+    Questions are validated once when loaded so rendering can assume this shape.
+    """
+    options = question_data.get("options")
+    return bool(
+        question_data.get("question") and
+        isinstance(options, dict) and len(options) == 4 and
+        all(isinstance(opt_text, str) for opt_text in options.values()) and
+        question_data.get("answer") in options and # Check if answer key exists in options
+        question_data.get("explanation")
+    )
+
+_CODE_FENCE_RE = re.compile(r'^```[\w-]*[ \t]*$', re.MULTILINE)
+# Question block patterns, compiled once rather than for every parsed block
+_Q_RE = re.compile(r'Q:\s*(.*)', re.IGNORECASE) # Removed re.DOTALL
+_OPT_RE = re.compile(r'^\s*([A-D])\)\s*(.*)', re.IGNORECASE | re.MULTILINE)
+_ANS_RE = re.compile(r'ANSWER:\s*([A-D])', re.IGNORECASE)
+_EXP_RE = re.compile(r'EXPLANATION:\s*(.*)', re.IGNORECASE | re.DOTALL)
+
+def _parse_question_block(block: str, timestamp: str) -> Optional[Dict[str, Any]]:
+    """Parses one Q/options/ANSWER/EXPLANATION block; returns None if it is incomplete or malformed."""
+    block = block.strip()
+    if not block:
+        return None
+
+    question_data = {"question": "", "options": {}, "answer": "", "explanation": ""}
+    
+    # Extract question
+    q_match = _Q_RE.search(block)
+    if q_match:
+        question_data["question"] = q_match.group(1).strip()
+
+    # Extract options, starting after the question so its text can't match as an option
+    for opt_match in _OPT_RE.finditer(block, q_match.end() if q_match else 0):
+        # Normalize keys once here so answer checks elsewhere are plain equality
+        question_data["options"][opt_match.group(1).upper()] = opt_match.group(2).strip()
+
+    # Extract answer
+    ans_match = _ANS_RE.search(block)
+    if ans_match:
+        question_data["answer"] = ans_match.group(1).upper()
+
+    # Extract explanation
+    exp_match = _EXP_RE.search(block)
+    if exp_match:
+        question_data["explanation"] = exp_match.group(1).strip()
+
+    # Validate extracted data for this block
+    if not _is_valid_question(question_data):
+        return None
+    question_data["timestamp"] = timestamp
+    question_data["_id"] = quiz_cache.question_hash(question_data) # Bookmark/seen-question id, stored with the pool
+    return question_data
+
+# Separator line between question blocks
+_QUESTION_SEPARATOR = "\n---\n"
+
+def _parse_ai_quiz_response(response_text: str, timestamp: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Parse raw quiz response from AI into structured format."""
+    parsed_questions = []
+    timestamp = timestamp or datetime.now().isoformat() # One generation time for every question
+    # Gemini sometimes wraps the reply in a ``` fence; drop fence lines before splitting.
+    # Works on partial (streamed) blocks too, where only one of the fence lines is present.
+    # No whole-text strip(): each block is stripped as it is parsed.
+    body = _CODE_FENCE_RE.sub('', response_text) if "```" in response_text else response_text
+    # Walk the "---" separators with a cursor instead of splitting into a list of blocks
+    pos = 0
+    while pos <= len(body):
+        block_end = body.find(_QUESTION_SEPARATOR, pos)
+        if block_end < 0:
+            block_end = len(body)
+        question_data = _parse_question_block(body[pos:block_end], timestamp)
+        if question_data:
             parsed_questions.append(question_data)
-        elif question_data["question"]: # Log if we have a question but other parts are missing
-            pass # All debug and user message calls removed for dev/prod direction
+        pos = block_end + len(_QUESTION_SEPARATOR)
 
     if not parsed_questions and response_text:
         pass # All debug and user message calls removed for dev/prod direction
     return parsed_questions
 
+def _stream_quiz_questions(response) -> Iterator[Dict[str, Any]]:
+    """
+    Yields questions from a streamed Gemini response as each block's "---" separator
+    arrives, so callers can act on the first questions while the rest are generating.
+    """
+    timestamp = datetime.now().isoformat()
+    pending_text = ""
+    for chunk in response:
+        # Only text near the end of the old buffer can start a separator with the new chunk
+        search_from = max(0, len(pending_text) - len(_QUESTION_SEPARATOR) + 1)
+        pending_text += chunk.text
+        block_start = 0
+        while (block_end := pending_text.find(_QUESTION_SEPARATOR, search_from)) >= 0:
+            yield from _parse_ai_quiz_response(pending_text[block_start:block_end], timestamp)
+            block_start = search_from = block_end + len(_QUESTION_SEPARATOR)
+        pending_text = pending_text[block_start:]
+    yield from _parse_ai_quiz_response(pending_text, timestamp) # Last block has no trailing separator
+
+
+# Option keys in the order the prompt asks for, with their radio indices
+_STANDARD_OPTION_KEYS = ("A", "B", "C", "D")
+_STANDARD_KEY_TO_IDX = {opt_key: i for i, opt_key in enumerate(_STANDARD_OPTION_KEYS)}
+
+def _prepare_questions_for_display(questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Precomputes per-question render data once when a quiz starts, instead of on every rerun."""
+    for question in questions:
+        if "_option_keys" in question: # Already prepared (shared pool questions are prepared on load)
+            continue
+        option_keys = tuple(question["options"]) # Radio choices; labels come from format_func
+        if option_keys == _STANDARD_OPTION_KEYS: # Nearly every question: share one lookup table
+            question["_option_keys"], question["_key_to_idx"] = _STANDARD_OPTION_KEYS, _STANDARD_KEY_TO_IDX
+        else:
+            question["_option_keys"] = option_keys
+            question["_key_to_idx"] = {opt_key: i for i, opt_key in enumerate(option_keys)}
+        if "_id" not in question: # Pools cached before ids were stored with them
+            question["_id"] = quiz_cache.question_hash(question)
+    return questions
 
 def _display_quiz_creation_form(ss, model, model_error):
     """Displays the form to create a new quiz."""
     st.subheader("New Quiz Configuration")
 
     # Display current suggested difficulty
-    st.info(f"Suggested Difficulty based on history: **{ss[f'{SS_PREFIX}current_quiz_difficulty']}**")
-
-    # Difficulty selection with clear label
-    selected_difficulty = st.selectbox(
-        "Difficulty Level",  # More descriptive label
-        options=["Easy", "Medium", "Hard"],
-        index=["Easy", "Medium", "Hard"].index(ss[f"{SS_PREFIX}current_quiz_difficulty"]) if ss[f"{SS_PREFIX}current_quiz_difficulty"] in ["Easy", "Medium", "Hard"] else 1,
-        key=f"{SS_PREFIX}difficulty_select",
-        help="Choose the difficulty level for your quiz",
-        label_visibility="visible"
-    )
+    st.info(f"Suggested Difficulty based on history: **{ss[_K_CURRENT_QUIZ_DIFFICULTY]}**")
+
+    # Batch the settings in a form so changing them doesn't rerun the script each time
+    with st.form(key=f"{SS_PREFIX}quiz_config_form"):
+        # Difficulty selection with clear label
+        selected_difficulty = st.selectbox(
+            "Difficulty Level",  # More descriptive label
+            options=DIFFICULTY_LEVELS,
+            index=DIFFICULTY_LEVELS.index(ss[_K_CURRENT_QUIZ_DIFFICULTY]) if ss[_K_CURRENT_QUIZ_DIFFICULTY] in DIFFICULTY_LEVELS else 1,
+            key=f"{SS_PREFIX}difficulty_select",
+            help="Choose the difficulty level for your quiz",
+            label_visibility="visible"
+        )
 
-    # Topic selection with clear label
-    # TODO: Consider dynamically populating topics from syllabus_manager or a predefined list for AI.
-    ai_topics = [
-        "NCC General", "National Integration", "Drill", "Weapon Training", 
-        "Map Reading", "Field Craft Battle Craft", "Civil Defence", 
-        "First Aid", "Leadership", "Social Service"
-    ]
-    selected_topic = st.selectbox(
-        "Study Topic",  # More descriptive label
-        options=ai_topics,
-        key=f"{SS_PREFIX}topic_select",
-        help="Select the topic you want to be quizzed on",
-        label_visibility="visible"
-    )
+        # Topic selection with clear label
+        selected_topic = st.selectbox(
+            "Study Topic",  # More descriptive label
+            options=AI_QUIZ_TOPICS,
+            key=f"{SS_PREFIX}topic_select",
+            help="Select the topic you want to be quizzed on",
+            label_visibility="visible"
+        )
 
-    # Number of questions with descriptive label
-    # The AI will attempt to generate this many, capped by difficulty settings in utils.py
-    num_questions_to_request = st.slider(
-        "Number of Questions to Generate",
-        min_value=1, # As per utils.py clamping
-        max_value=10, # As per utils.py clamping
-        value=5,      # Default value
-        step=1,
-        key=f"{SS_PREFIX}num_questions_slider_ai",
-        help="Choose how many questions you want in your quiz",
-        disabled=(model_error is not None or _is_in_cooldown(f"{SS_PREFIX}last_quiz_api_call_time")),
-        label_visibility="visible"
-    )
+        # Number of questions with descriptive label
+        # The AI will attempt to generate this many, capped by difficulty settings in utils.py
+        num_questions_to_request = st.slider(
+            "Number of Questions to Generate",
+            min_value=1, # As per utils.py clamping
+            max_value=10, # As per utils.py clamping
+            value=5,      # Default value
+            step=1,
+            key=f"{SS_PREFIX}num_questions_slider_ai",
+            help="Choose how many questions you want in your quiz",
+            disabled=(model_error is not None or _is_in_cooldown(_K_LAST_QUIZ_API_CALL_TIME)),
+            label_visibility="visible"
+        )
+
+        start_clicked = st.form_submit_button("Start AI Generated Quiz", disabled=(model_error is not None))
 
     if model_error:
         st.error(f"AI Model Error: {model_error}. Quiz generation is unavailable.")
 
-    if st.button("Start AI Generated Quiz", key=f"{SS_PREFIX}start_quiz_button_ai", disabled=(model_error is not None)):
-        if _is_in_cooldown(f"{SS_PREFIX}last_quiz_api_call_time"):
+    if start_clicked:
+        if _is_in_cooldown(_K_LAST_QUIZ_API_CALL_TIME):
             st.warning(_cooldown_message("quiz generation"))
             return
 
@@ -273,42 +391,47 @@ def _display_quiz_creation_form(ss, model, model_error):
             st.error(f"Failed to generate quiz: {gen_error or 'No questions returned by AI.'}")
             return
         
-        ss[f"{SS_PREFIX}current_quiz_difficulty"] = selected_difficulty # Set chosen difficulty
-        ss[f"{SS_PREFIX}current_quiz_topic"] = selected_topic # Store chosen topic
-        ss[f"{SS_PREFIX}quiz_questions"] = questions_to_start
-        if ss[f"{SS_PREFIX}quiz_questions"]:
-            ss[f"{SS_PREFIX}quiz_active"] = True
-            ss[f"{SS_PREFIX}current_question_index"] = 0
-            ss[f"{SS_PREFIX}user_answers"] = {}
-            ss[f"{SS_PREFIX}quiz_start_time"] = datetime.now()
-            ss[f"{SS_PREFIX}quiz_submitted"] = False
-            ss[f"{SS_PREFIX}quiz_result"] = None
-            ss[f"{SS_PREFIX}quiz_bookmarks"] = [] # Ensure bookmarks are clear for new quiz
-            st.rerun() # Trigger rerun to display the quiz
+        ss.update({
+            _K_CURRENT_QUIZ_DIFFICULTY: selected_difficulty, # Set chosen difficulty
+            _K_QUIZ_HEADING: f"Quiz (Difficulty: {selected_difficulty})", # Built once per quiz
+            _K_CURRENT_QUIZ_TOPIC: selected_topic, # Store chosen topic
+            _K_QUIZ_QUESTIONS: _prepare_questions_for_display(questions_to_start),
+            _K_QUIZ_ANSWER_KEYS: [q['answer'] for q in questions_to_start], # Column for scoring
+            _K_QUIZ_ACTIVE: True,
+            _K_CURRENT_QUESTION_INDEX: 0,
+            _K_USER_ANSWERS: array('b', [-1]) * len(questions_to_start),
+            _K_QUIZ_START_TIME: datetime.now(),
+            _K_QUIZ_START_MONO: time.monotonic(),
+            _K_QUIZ_SUBMITTED: False,
+            _K_QUIZ_RESULT: None,
+            _K_QUIZ_BOOKMARKS: {}, # Ensure bookmarks are clear for new quiz
+        })
+        st.rerun() # Trigger rerun to display the quiz
 
 def _save_generated_quiz_to_log(topic: str, questions: List[Dict[str, Any]]) -> None:
     """Saves the generated quiz questions to a log file."""
     try:
         quiz_log_path = Config.LOG_PATHS['quiz']['log'] # Uses Config from utils
-        history = []
-        if os.path.exists(quiz_log_path):
-            with open(quiz_log_path, 'r', encoding='utf-8') as f:
-                try:
-                    history = json.load(f)
-                except json.JSONDecodeError:
-                    history = [] # Start fresh if file is corrupt
-        
-        history.append({
+        entry = {
             "timestamp": datetime.now().isoformat(),
             "topic": topic,
             "questions_generated_count": len(questions),
             "questions": questions # Save the actual questions
-        })
-        with open(quiz_log_path, 'w', encoding='utf-8') as f:
-            json.dump(history, f, indent=2, ensure_ascii=False)
+        }
+        # JSON Lines log: append one line per quiz instead of rewriting the whole history
+        with open(quiz_log_path, 'ab') as f:
+            f.write(orjson.dumps(entry) + b"\n")
     except Exception as e:
         pass # All debug and user message calls removed for dev/prod direction
 
+@st.cache_data(ttl=600)
+def _load_valid_pool(cache_key: str, version: int) -> List[Dict[str, Any]]:
+    """
+    Reads, validates and prepares a cached question pool. version is the pool's stored time, so
+    a pool written after this was memoized gets a new cache entry; every caller gets its own copy.
+    """
+    return _prepare_questions_for_display([q for q in quiz_cache.get(cache_key) or [] if _is_valid_question(q)])
+
 def _ai_generate_quiz_questions(
     model: Optional[genai.GenerativeModel],
     model_error: Optional[str],
@@ -320,40 +443,80 @@ def _ai_generate_quiz_questions(
     if model_error or not model:
         return None, f"Model error: {model_error or 'Model not initialized'}"
 
-    # num_questions_requested is already validated by the slider (1-10)
-    prompt = _build_quiz_prompt(topic, num_questions_requested, difficulty)
+    # Draw from a cached pool for this topic/difficulty; only call the API on a miss
+    cache_key = quiz_cache.make_key(topic, difficulty)
+    user_id = st.session_state.get("user_id")
+    version = quiz_cache.version(cache_key)
+    pool = _load_valid_pool(cache_key, version) if version is not None else []
+    if len(pool) >= num_questions_requested and quiz_cache.unseen_count(pool, user_id) >= num_questions_requested:
+        return quiz_cache.draw(pool, num_questions_requested, user_id), None
+
+    # Generate a full batch so later quizzes on the same settings skip the API call; a pool the
+    # user has mostly seen already is extended with it rather than served again
+    pool_size = max(num_questions_requested, quiz_cache.QUIZ_POOL_SIZE)
+    prompt = _build_quiz_prompt(topic, pool_size, difficulty)
 
     try:
         response = model.generate_content(
             prompt,
-            generation_config=genai.GenerationConfig(temperature=TEMP_QUIZ, max_output_tokens=MAX_TOKENS_QUIZ)
+            generation_config=QUIZ_GENERATION_CONFIG,
+            stream=True
         )
-        raw_response_text = response.text
-        parsed_questions = _parse_ai_quiz_response(raw_response_text)
+        # Report progress per question as the stream delivers them
+        parsed_questions = []
+        progress_placeholder = st.empty()
+        for question_data in _stream_quiz_questions(response):
+            parsed_questions.append(question_data)
+            progress_placeholder.caption(f"Received {len(parsed_questions)} of {pool_size} questions...")
+        progress_placeholder.empty()
 
         if parsed_questions:
-            st.session_state[f"{SS_PREFIX}last_quiz_api_call_time"] = datetime.now()
+            st.session_state[_K_LAST_QUIZ_API_CALL_TIME] = datetime.now()
             _save_generated_quiz_to_log(topic, parsed_questions) # Log the generated questions
-            return parsed_questions, None
+            pool = quiz_cache.extend(cache_key, parsed_questions) # New version, so the memoized pool is not reused
+            valid_pool = [q for q in pool if _is_valid_question(q)] # Questions merged in from the stored pool are unchecked
+            return quiz_cache.draw(valid_pool, num_questions_requested, user_id), None
         return None, "Failed to parse valid quiz questions from AI response. Check logs for raw response. Please try again or rephrase."
     except Exception as e:
         return None, "Apologies, an error occurred while generating the quiz. Please try again."
 
+def _toggle_bookmark(ss, question: Dict[str, Any], q_index: int) -> None:
+    """Adds or removes the question from this quiz's bookmarks (bookmark button callback)."""
+    # Keyed by question id: O(1) membership, add and remove, while keeping bookmark order
+    bookmarks = ss.setdefault(_K_QUIZ_BOOKMARKS, {})
+    if bookmarks.pop(question["_id"], None) is None:
+        bookmarks[question["_id"]] = question
+        st.toast(f"Question {q_index+1} bookmarked!")
+    else:
+        st.toast(f"Question {q_index+1} unbookmarked.")
+
+def _submit_answer(ss, q_index: int, num_questions: int) -> None:
+    """Stores the selected option's index and moves to the next question ("Next Question" callback)."""
+    selected_key = ss.get(f"q_{q_index}_option") # None if nothing was selected
+    ss[_K_USER_ANSWERS][q_index] = ss[_K_QUIZ_QUESTIONS][q_index]['_key_to_idx'].get(selected_key, -1)
+    ss[_K_CURRENT_QUESTION_INDEX] = q_index + 1
+    # If all questions answered, go to results
+    if q_index + 1 >= num_questions:
+        ss[_K_QUIZ_END_TIME] = datetime.now() # Set end time BEFORE calculating results
+        _calculate_results(ss)
+        ss[_K_QUIZ_SUBMITTED] = True
+
+@_fragment
 def _display_active_quiz(ss):
     """Displays the active quiz questions."""
-    st.subheader(f"Quiz (Difficulty: {ss[f'{SS_PREFIX}current_quiz_difficulty']})")
+    if ss[_K_QUIZ_SUBMITTED]:
+        st.rerun() # Last answer was submitted within this fragment; results replace the whole page
+    st.subheader(ss.get(_K_QUIZ_HEADING) or f"Quiz (Difficulty: {ss[_K_CURRENT_QUIZ_DIFFICULTY]})")
     
-    questions = ss.get(f"{SS_PREFIX}quiz_questions", [])
-    current_q_index = ss.get(f"{SS_PREFIX}current_question_index", 0)
+    questions = ss.get(_K_QUIZ_QUESTIONS, [])
+    current_q_index = ss.get(_K_CURRENT_QUESTION_INDEX, 0)
     num_questions = len(questions)
 
-    if not questions or not (0 <= current_q_index < num_questions):
-        st.error("Quiz error: No questions loaded or invalid question index.")
-        if st.button("Return to Quiz Setup", key="error_return_to_setup"):
-            _reset_quiz_state(ss)
-            st.rerun()
-        st.warning("No questions available for this quiz. Please go back and select a different configuration.")
-        if st.button("Back to Quiz Setup", key="back_to_setup_no_q"):
+    # Cheap render guard: every question reaching session state should be validated and prepared
+    if (not questions or not (0 <= current_q_index < num_questions)
+            or "_option_keys" not in questions[current_q_index]):
+        st.error("Quiz error: No questions loaded or invalid question index. Please go back and select a different configuration.")
+        if st.button("Return to Quiz Setup", key=f"{SS_PREFIX}error_return_to_setup"):
             _reset_quiz_state(ss)
             st.rerun()
         return
@@ -368,49 +531,30 @@ def _display_active_quiz(ss):
     # Enhanced mobile-friendly question display
     create_quiz_question_card(question['question'], current_q_index + 1)
     
-    # Bookmark button
-    col_bookmark_btn = st.columns([1])[0]
-    with col_bookmark_btn:
-        # Bookmark button - MOVED OUTSIDE THE FORM & ENHANCED
-        is_bookmarked = question in ss.get(f"{SS_PREFIX}quiz_bookmarks", [])
-        bookmark_icon = "🌟" if is_bookmarked else "⭐"
-        bookmark_text = "Bookmarked" if is_bookmarked else "Bookmark"
-        if st.button(f"{bookmark_icon} {bookmark_text}", 
-                       key=f"bookmark_toggle_{current_q_index}", # Unique key for toggle
-                       help="Bookmark/Unbookmark this question for later review",
-                       use_container_width=True):
-            bookmarks = ss.get(f"{SS_PREFIX}quiz_bookmarks", [])
-            if not is_bookmarked:
-                bookmarks.append(question)
-                st.toast(f"Question {current_q_index+1} bookmarked!")
-            else:
-                bookmarks.remove(question) # Ensure removal works
-                st.toast(f"Question {current_q_index+1} unbookmarked.")
-            ss[f"{SS_PREFIX}quiz_bookmarks"] = bookmarks # Update session state
-            st.rerun()
+    # Bookmark button - MOVED OUTSIDE THE FORM & ENHANCED (full width, so no column wrapper needed)
+    # Toggled in an on_click callback, which runs before this rerun renders, so the
+    # label is already up to date and no extra st.rerun() is needed.
+    is_bookmarked = question["_id"] in ss[_K_QUIZ_BOOKMARKS]
+    bookmark_icon = "🌟" if is_bookmarked else "⭐"
+    bookmark_text = "Bookmarked" if is_bookmarked else "Bookmark"
+    st.button(f"{bookmark_icon} {bookmark_text}", 
+              key=f"bookmark_toggle_{current_q_index}", # Unique key for toggle
+              help="Bookmark/Unbookmark this question for later review",
+              use_container_width=True,
+              on_click=_toggle_bookmark,
+              args=(ss, question, current_q_index))
 
     # Prepare options for st.radio
     # question['options'] is expected to be like {'A': 'Text A', 'B': 'Text B', ...}
     # question['answer'] is the key, e.g., 'A'
-    # ss[f"{SS_PREFIX}user_answers"][str(current_q_index)] stores the key, e.g., 'A'
+    # ss[_K_USER_ANSWERS][current_q_index] stores the option's index, e.g., 0 for 'A' (-1 if unanswered)
     
-    options_dict = question.get('options', {})
-    if not options_dict or not all(isinstance(opt_text, str) for opt_text in options_dict.values()) or len(options_dict) < 2 : # Basic check for valid options
-        st.error(f"Question {current_q_index + 1} data is malformed: Options are missing, not strings, or incomplete. Please report this issue or try generating a new quiz.")
-        if st.button("Return to Quiz Setup", key=f"malformed_q_return_{current_q_index}"):
-            _reset_quiz_state(ss)
-            st.rerun()
-        return
-        
-    options_display_list = list(options_dict.values()) # List of option texts for display
+    # Options were validated once by _is_valid_question when the quiz was loaded
+    options_dict = question['options']
     
     # Determine the index for st.radio if an answer was previously selected
-    selected_option_index = None
-    previous_answer_key = ss[f"{SS_PREFIX}user_answers"].get(str(current_q_index))
-    if previous_answer_key and previous_answer_key in options_dict:
-        previous_answer_text = options_dict[previous_answer_key]
-        if previous_answer_text in options_display_list:
-            selected_option_index = options_display_list.index(previous_answer_text)
+    previous_answer_index = ss[_K_USER_ANSWERS][current_q_index]
+    selected_option_index = previous_answer_index if previous_answer_index >= 0 else None # None if unanswered
     
     # Use a form to capture user's answer
     with st.form(key=f"question_form_{current_q_index}"):
@@ -418,9 +562,11 @@ def _display_active_quiz(ss):
         st.markdown('<div class="quiz-options">', unsafe_allow_html=True)
         
         # User answer selection with proper label
-        user_selected_text = st.radio(
+        # Choices are the option keys themselves, so the selection needs no mapping back
+        st.radio(
             "Answer Options",  # More descriptive than "Select your answer:"
-            options=options_display_list,
+            options=question['_option_keys'],
+            format_func=options_dict.__getitem__, # Show the option text
             key=f"q_{current_q_index}_option",
             index=selected_option_index,
             help="Select the correct answer from the options below",
@@ -432,10 +578,14 @@ def _display_active_quiz(ss):
         # Navigation buttons with clear labels
         col_next_btn, col_abandon_btn = st.columns(2)
         with col_next_btn:
-            submit_button = st.form_submit_button(
+            # Recorded in an on_click callback, which runs before the rerun the submit triggers,
+            # so that rerun already shows the next question and no extra st.rerun() is needed
+            st.form_submit_button(
                 "Next Question ▶️",
                 use_container_width=True,
-                help="Save your answer and move to the next question"
+                help="Save your answer and move to the next question",
+                on_click=_submit_answer,
+                args=(ss, current_q_index, num_questions)
             )
         with col_abandon_btn:
             if st.form_submit_button(
@@ -450,54 +600,37 @@ def _display_active_quiz(ss):
 
     # The bookmark button is now outside the form, handled above.
 
-    # Handle the "Next Question" button click (if it was the one pressed)
-    if submit_button:
-        # Find the key ('A', 'B', 'C', 'D') corresponding to the selected text
-        user_choice_key = None
-        for opt_key, opt_val in options_dict.items():
-            if opt_val == user_selected_text:
-                user_choice_key = opt_key
-                break
-        
-        if user_choice_key:
-            ss[f"{SS_PREFIX}user_answers"][str(current_q_index)] = user_choice_key
-        else:
-            st.warning(f"Could not map selected answer '{user_selected_text}' back to an option key for Q{current_q_index+1}. This might indicate an issue with question data. Storing raw text.")
-            ss[f"{SS_PREFIX}user_answers"][str(current_q_index)] = user_selected_text # Fallback, though this might affect scoring if not a key
-        ss[f"{SS_PREFIX}current_question_index"] += 1
-        # If all questions answered, go to results
-        if ss[f"{SS_PREFIX}current_question_index"] >= num_questions:
-            ss[f"{SS_PREFIX}quiz_end_time"] = datetime.now() # Set end time BEFORE calculating results
-            _calculate_results(ss)
-            ss[f"{SS_PREFIX}quiz_submitted"] = True
-        st.rerun() # Rerun to display next question or results
-
 def _calculate_results(ss):
     """Calculates and stores quiz results."""
-    correct_answers = 0
-    wrong_questions = []
-    
-    for i, question in enumerate(ss[f"{SS_PREFIX}quiz_questions"]):
-        user_ans_key = ss[f"{SS_PREFIX}user_answers"].get(str(i)) # This should be the key 'A', 'B', etc.
-        correct_ans_key = question.get('answer')
-
-        if user_ans_key == correct_ans_key:
-            correct_answers += 1
-        else:
-            wrong_questions.append({
-                "index": i,
-                "question": question,
-                "user_answer_key": user_ans_key, # Store the key of user's answer
-                "correct_answer_key": correct_ans_key # Store the key of correct answer
-            })
+    # A rerun landing here again for the same attempt must not record or reward it twice
+    if ss.get(_K_QUIZ_SUBMITTED) or ss.get(_K_QUIZ_RESULT):
+        return
+    questions = ss[_K_QUIZ_QUESTIONS]
+    answer_keys = ss.get(_K_QUIZ_ANSWER_KEYS) or [q.get('answer') for q in questions]
+    # One completion time shared by the result, the score history and the sync queue
+    completed_at = (ss[_K_QUIZ_END_TIME] or datetime.now()).isoformat()
+
+    # Single pass zipping the answer and answer-key columns. Only indices are kept: questions,
+    # answers and keys stay in their session-state lists until the next quiz replaces them.
+    wrong_indices = [
+        i for i, (user_ans_idx, question, correct_ans_key)
+        in enumerate(zip(ss[_K_USER_ANSWERS], questions, answer_keys))
+        if user_ans_idx < 0 or question['_option_keys'][user_ans_idx] != correct_ans_key
+    ]
     
-    total_questions = len(ss[f"{SS_PREFIX}quiz_questions"])
+    total_questions = len(questions)
+    correct_answers = total_questions - len(wrong_indices)
     score_percentage = (correct_answers / total_questions) * 100 if total_questions > 0 else 0
 
     duration_str = "N/A"
-    if ss[f"{SS_PREFIX}quiz_start_time"] and ss[f"{SS_PREFIX}quiz_end_time"]:
-        duration = ss[f"{SS_PREFIX}quiz_end_time"] - ss[f"{SS_PREFIX}quiz_start_time"]
-        total_seconds = duration.total_seconds()
+    # Monotonic clock for the duration: immune to wall-clock changes and no datetime arithmetic
+    start_mono = ss.get(_K_QUIZ_START_MONO)
+    total_seconds = None
+    if start_mono is not None:
+        total_seconds = time.monotonic() - start_mono
+    elif ss[_K_QUIZ_START_TIME] and ss[_K_QUIZ_END_TIME]: # Quizzes started before the monotonic start was kept
+        total_seconds = (ss[_K_QUIZ_END_TIME] - ss[_K_QUIZ_START_TIME]).total_seconds()
+    if total_seconds is not None:
         minutes = int(total_seconds // 60)
         seconds = int(total_seconds % 60)
 
@@ -508,48 +641,66 @@ def _calculate_results(ss):
         else: # Less than a second
             duration_str = f"{total_seconds:.2f} sec"
 
-    ss[f"{SS_PREFIX}quiz_result"] = {
+    ss[_K_QUIZ_RESULT] = {
         "score": score_percentage,
         "correct": correct_answers,
-        "wrong": len(wrong_questions),
+        "wrong": len(wrong_indices),
         "total": total_questions,
-        "wrong_questions": wrong_questions,
+        "wrong_indices": wrong_indices, # Indices into quiz_questions / user_answers / quiz_answer_keys
         "duration": duration_str,
-        "timestamp": datetime.now().isoformat(),
-        "difficulty": ss[f"{SS_PREFIX}current_quiz_difficulty"],
-        "topic": ss[f"{SS_PREFIX}current_quiz_topic"] # Include topic in result
+        "timestamp": completed_at,
+        "difficulty": ss[_K_CURRENT_QUIZ_DIFFICULTY],
+        "topic": ss[_K_CURRENT_QUIZ_TOPIC] # Include topic in result
     }
     
     # Append result to persisted history
     # This uses the new dedicated function from utils.py
-    append_quiz_score_entry({
-        "timestamp": datetime.now().isoformat(),
+    score_entry = {
+        "timestamp": completed_at,
         "score": score_percentage,
-        "difficulty": ss[f"{SS_PREFIX}current_quiz_difficulty"],
-        "topic": ss[f"{SS_PREFIX}current_quiz_topic"]
-    })
+        "difficulty": ss[_K_CURRENT_QUIZ_DIFFICULTY],
+        "topic": ss[_K_CURRENT_QUIZ_TOPIC]
+    }
+    append_quiz_score_entry(score_entry)
+    # Keep the session's copy in step instead of reloading the file
+    ss.setdefault(_K_QUIZ_SCORE_HISTORY, []).append(score_entry)
     
     # Award XP for quiz completion
     base_xp = 50  # Base XP for completing a quiz
     if score_percentage == 100:
-        award_xp("quiz_perfect", {"score": score_percentage, "difficulty": ss[f"{SS_PREFIX}current_quiz_difficulty"]})
+        award_xp("quiz_perfect", {"score": score_percentage, "difficulty": ss[_K_CURRENT_QUIZ_DIFFICULTY]})
         show_xp_notification(100, "perfect quiz score! 🎯")
     else:
-        award_xp("quiz_completed", {"score": score_percentage, "difficulty": ss[f"{SS_PREFIX}current_quiz_difficulty"]})
+        award_xp("quiz_completed", {"score": score_percentage, "difficulty": ss[_K_CURRENT_QUIZ_DIFFICULTY]})
         show_xp_notification(base_xp, f"completing the quiz ({score_percentage:.1f}%)")
 
     # After quiz completion, queue summary for sync
     quiz_metadata = {
-        "topic": ss[f"{SS_PREFIX}current_quiz_topic"],
+        "topic": ss[_K_CURRENT_QUIZ_TOPIC],
         "score": score_percentage,
-        "difficulty": ss[f"{SS_PREFIX}current_quiz_difficulty"],
-        "timestamp": datetime.now().isoformat(),
+        "difficulty": ss[_K_CURRENT_QUIZ_DIFFICULTY],
+        "timestamp": completed_at,
+        # Stable per attempt, so the sync queue can drop a duplicate of this result
+        "result_id": hashlib.md5(f"{ss[_K_QUIZ_START_TIME]}|{ss[_K_CURRENT_QUIZ_TOPIC]}".encode()).hexdigest(),
     }
-    queue_for_sync(quiz_metadata, "quiz_metadata")
+    queue_for_sync_background(quiz_metadata, "quiz_metadata") # File write happens off the render path
+
+def _render_review_options(options: Dict[str, str], correct_key: Optional[str], user_key: Optional[str] = None) -> None:
+    """Renders a question's options as one markdown element, highlighting the correct and chosen ones."""
+    parts = []
+    for opt_key, opt_text in options.items():
+        line = html.escape(f"{opt_key}) {opt_text}")
+        if opt_key == correct_key:
+            parts.append(f'<span style="color: #16a34a; font-weight: 600;">✅ {line} (Correct Answer)</span>')
+        elif opt_key == user_key:
+            parts.append(f'<span style="color: #dc2626; font-weight: 600;">❌ {line} (Your Answer)</span>')
+        else:
+            parts.append(line)
+    st.markdown("<br>".join(parts), unsafe_allow_html=True)
 
 def _display_quiz_results(ss):
     """Displays the quiz results."""
-    result = ss[f"{SS_PREFIX}quiz_result"]
+    result = ss[_K_QUIZ_RESULT]
     if not result:
         st.error("No quiz results available.")
         return
@@ -569,9 +720,14 @@ def _display_quiz_results(ss):
     st.write(f"Total Questions: {result['total']}")
     st.write(f"⏱️ Duration: {result['duration']}")
     st.write(f"🏋️ Difficulty: {result['difficulty']}")
-    st.write(f"📚 Topic: {ss.get(f'{SS_PREFIX}current_quiz_topic', 'N/A')}")
+    st.write(f"📚 Topic: {ss.get(_K_CURRENT_QUIZ_TOPIC, 'N/A')}")
     st.markdown("---") # Visual separator
 
+    questions = ss[_K_QUIZ_QUESTIONS]
+    answer_keys = ss.get(_K_QUIZ_ANSWER_KEYS) or [q.get('answer') for q in questions]
+    # Results from older sessions stored the wrong questions themselves
+    wrong_indices = result.get('wrong_indices') or [q['index'] for q in result.get('wrong_questions', [])]
+
     # FIX: "Retry Wrong Questions" When None Wrong - Disable or hide button
     wrong_questions_count = result['wrong']
     if wrong_questions_count == 0:
@@ -580,18 +736,24 @@ def _display_quiz_results(ss):
     else:
         if st.button("🔁 Retry Wrong Questions", key="retry_wrong_q_button"):
             # Set up a new quiz with only the wrong questions
-            ss[f"{SS_PREFIX}quiz_active"] = True
-            ss[f"{SS_PREFIX}current_question_index"] = 0
-            ss[f"{SS_PREFIX}user_answers"] = {}
-            ss[f"{SS_PREFIX}quiz_start_time"] = datetime.now()
-            ss[f"{SS_PREFIX}quiz_end_time"] = None
-            ss[f"{SS_PREFIX}quiz_submitted"] = False
-            ss[f"{SS_PREFIX}quiz_result"] = None
-            ss[f"{SS_PREFIX}quiz_questions"] = [q['question'] for q in result['wrong_questions']]
-            ss[f"{SS_PREFIX}quiz_bookmarks"] = [] # Clear bookmarks when retrying wrong questions
-            # Maintain the original topic and difficulty for the retry session
-            ss[f"{SS_PREFIX}current_quiz_topic"] = result.get('topic', 'General Knowledge')
-            ss[f"{SS_PREFIX}current_quiz_difficulty"] = result.get('difficulty', 'Medium')
+            retry_difficulty = result.get('difficulty', 'Medium')
+            ss.update({
+                _K_QUIZ_ACTIVE: True,
+                _K_CURRENT_QUESTION_INDEX: 0,
+                _K_USER_ANSWERS: array('b', [-1]) * len(wrong_indices),
+                _K_QUIZ_START_TIME: datetime.now(),
+                _K_QUIZ_START_MONO: time.monotonic(),
+                _K_QUIZ_END_TIME: None,
+                _K_QUIZ_SUBMITTED: False,
+                _K_QUIZ_RESULT: None,
+                _K_QUIZ_QUESTIONS: [questions[i] for i in wrong_indices],
+                _K_QUIZ_ANSWER_KEYS: [answer_keys[i] for i in wrong_indices],
+                _K_QUIZ_BOOKMARKS: {}, # Clear bookmarks when retrying wrong questions
+                # Maintain the original topic and difficulty for the retry session
+                _K_CURRENT_QUIZ_TOPIC: result.get('topic', 'General Knowledge'),
+                _K_CURRENT_QUIZ_DIFFICULTY: retry_difficulty,
+                _K_QUIZ_HEADING: f"Quiz (Difficulty: {retry_difficulty})",
+            })
             st.rerun()
 
     if st.button("Start New Quiz", key="new_quiz_from_results"):
@@ -599,68 +761,52 @@ def _display_quiz_results(ss):
         st.rerun()
 
     if wrong_questions_count > 0:
+        _display_wrong_answer_review(questions, answer_keys, ss[_K_USER_ANSWERS], wrong_indices)
+
+    if ss[_K_QUIZ_BOOKMARKS]:
+        _display_bookmarked_questions(ss[_K_QUIZ_BOOKMARKS])
+
+@_fragment
+def _display_wrong_answer_review(questions: List[Dict[str, Any]], answer_keys: List[Optional[str]],
+                                 user_answers: array, wrong_indices: List[int]) -> None:
+    """Lists each wrongly answered question with the chosen and correct options and its explanation."""
+    st.markdown("---")
+    st.subheader("Review Wrong Answers")
+    for q_index in wrong_indices: # 0-based indices from the original quiz
+        q_data = questions[q_index] # Full question dict
+        user_answer_idx = user_answers[q_index]
+        user_answered_key = q_data['_option_keys'][user_answer_idx] if user_answer_idx >= 0 else None
+        correct_answer_key = answer_keys[q_index]
+
+        st.markdown(f"**Q{q_index + 1}: {q_data.get('question', 'N/A')}**")
+
+        options_in_q = q_data.get('options', {})
+        st.markdown("**Options:**")
+        _render_review_options(options_in_q, correct_answer_key, user_answered_key)
+        
+        explanation = q_data.get('explanation', 'No explanation available for this question.')
+        with st.expander("View Explanation", expanded=True): # Show explanation by default
+            st.info(explanation if explanation else "_No explanation provided._")
         st.markdown("---")
-        st.subheader("Review Wrong Answers")
-        for wrong_q_info in result['wrong_questions']:
-            q_data = wrong_q_info['question'] # Full question dict
-            q_index = wrong_q_info['index'] # 0-based index from the original quiz
-            user_answered_key = wrong_q_info['user_answer_key'] 
-            correct_answer_key = wrong_q_info['correct_answer_key']
-
-            st.markdown(f"**Q{q_index + 1}: {q_data.get('question', 'N/A')}**")
-
-            options_in_q = q_data.get('options', {})
-            st.markdown("**Options:**")
-            for opt_key, opt_text in options_in_q.items():
-                if opt_key == correct_answer_key:
-                    st.success(f"- {opt_key}) {opt_text} (Correct Answer)")
-                elif opt_key == user_answered_key:
-                    st.error(f"- {opt_key}) {opt_text} (Your Answer)")
-                else:
-                    st.markdown(f"- {opt_key}) {opt_text}")
-            
-            # Explicitly state the user's answer if it was wrong, for clarity,
-            # especially if it wasn't highlighted in the list (e.g., if user_answered_key was None or unexpected).
-            if user_answered_key != correct_answer_key:
-                user_answer_display_text = "Not answered"
-                if user_answered_key is not None:
-                    if user_answered_key in options_in_q:
-                        user_answer_display_text = f"{user_answered_key}) {options_in_q[user_answered_key]}"
-                    else:
-                        user_answer_display_text = str(user_answered_key) # Display the raw recorded answer if not a valid key
-                # The loop above already highlights the user's choice if it's a valid option.
-                # This explicit message can be redundant but ensures clarity if highlighting failed or answer was unusual.
-                # To avoid redundancy if already highlighted:
-                # if not (user_answered_key in options_in_q): # Only show this if not already highlighted in the list
-                #    st.error(f"Your recorded answer: {user_answer_display_text}")
-                # For now, the highlighting in the loop is the primary indicator.
-                pass # The highlighting within the option list should cover displaying the user's wrong answer.
- 
-            explanation = q_data.get('explanation', 'No explanation available for this question.')
-            with st.expander("View Explanation", expanded=True): # Show explanation by default
-                st.info(explanation if explanation else "_No explanation provided._")
-            st.markdown("---")
-
-    if ss[f"{SS_PREFIX}quiz_bookmarks"]:
+
+@_fragment
+def _display_bookmarked_questions(bookmarks: Dict[str, Dict[str, Any]]) -> None:
+    """Lists the questions bookmarked during the quiz with their answers and explanations."""
+    st.markdown("---")
+    st.subheader("Bookmarked Questions")
+    for b_q in bookmarks.values():
+        st.markdown(f"**Bookmarked Q: {b_q.get('question', 'N/A')}**")
+        options_in_bookmark = b_q.get('options', {})
+        correct_answer_key_bookmark = b_q.get('answer')
+        st.markdown("**Options:**")
+        _render_review_options(options_in_bookmark, correct_answer_key_bookmark)
+
+        explanation = b_q.get('explanation', 'No explanation available.')
+        with st.expander("View Explanation", expanded=True): # Show explanation by default
+             st.info(explanation if explanation else "_No explanation provided._")
+        if b_q.get("chapter"): # This field might not be present for AI generated questions
+            st.caption(f"Chapter: {b_q['chapter']}")
         st.markdown("---")
-        st.subheader("Bookmarked Questions")
-        for i, b_q in enumerate(ss[f"{SS_PREFIX}quiz_bookmarks"]):
-            st.markdown(f"**Bookmarked Q: {b_q.get('question', 'N/A')}**")
-            options_in_bookmark = b_q.get('options', {})
-            correct_answer_key_bookmark = b_q.get('answer')
-            st.markdown("**Options:**")
-            for opt_key, opt_text in options_in_bookmark.items():
-                if opt_key == correct_answer_key_bookmark:
-                    st.success(f"- {opt_key}) {opt_text} (Correct Answer)")
-                else:
-                    st.markdown(f"- {opt_key}) {opt_text}")
-
-            explanation = b_q.get('explanation', 'No explanation available.')
-            with st.expander("View Explanation", expanded=True): # Show explanation by default
-                 st.info(explanation if explanation else "_No explanation provided._")
-            if b_q.get("chapter"): # This field might not be present for AI generated questions
-                st.caption(f"Chapter: {b_q['chapter']}")
-            st.markdown("---")
 
 # Main function for the quiz interface
 def quiz_interface(model, model_error): # Accept model and model_error
@@ -676,12 +822,15 @@ def quiz_interface(model, model_error): # Accept model and model_error
     with tab1:
         st.write("Test your knowledge about NCC topics!")
         
-        # Show performance summary at the top
-        create_quiz_performance_summary()
+        # Show performance summary at the top, except mid-quiz where it would be
+        # recomputed from the full history on every answer click
+        quiz_in_progress = ss[_K_QUIZ_ACTIVE] and not ss[_K_QUIZ_SUBMITTED]
+        if not quiz_in_progress:
+            create_quiz_performance_summary()
         
-        if not ss[f"{SS_PREFIX}quiz_active"]:
+        if not ss[_K_QUIZ_ACTIVE]:
             _display_quiz_creation_form(ss, model, model_error) # Pass model and model_error
-        elif not ss[f"{SS_PREFIX}quiz_submitted"]:
+        elif not ss[_K_QUIZ_SUBMITTED]:
             _display_active_quiz(ss)
         else:
             _display_quiz_results(ss)
@@ -4,8 +4,11 @@ Provides comprehensive input sanitization, validation, and rate limiting
 """
 import re
 import time
+import string
 import hashlib
+import uuid
 from typing import Any, Dict, List, Optional, Union
+from collections import deque
 from datetime import datetime, timedelta
 import streamlit as st
 from functools import wraps
@@ -47,6 +50,28 @@ class SecurityValidator:
         r'\/\*.*?\*\/',
     ]
     
+    # Each pattern list compiled once into a single alternation, so a call makes one regex pass per list
+    _DANGEROUS_RE = re.compile("|".join(f"(?:{p})" for p in DANGEROUS_PATTERNS), re.IGNORECASE)
+    _SQL_INJECTION_RE = re.compile("|".join(f"(?:{p})" for p in SQL_INJECTION_PATTERNS), re.IGNORECASE)
+    # Every DANGEROUS_PATTERNS match needs one of these characters, and html.escape only changes
+    # text containing them. Text without any is left unchanged by both, so both can be skipped.
+    _MARKUP_CHARS_RE = re.compile(r'[<>&"\':=(]')
+    _WHITESPACE_RE = re.compile(r'\s+')
+    _EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+    # Common NCC reg number patterns (adjust as needed)
+    _NCC_REG_NO_RE = re.compile(
+        r'^\d{2}[A-Z]{2}\d{8}$'  # 2 digits + 2 letters + 8 digits
+        r'|^[A-Z]{2}\d{10}$'     # 2 letters + 10 digits
+        r'|^\d{12}$'             # 12 digits
+    )
+    _MOBILE_RE = re.compile(r'^[6-9]\d{9}$')
+    # Character classes for validate_password ([A-Z], [a-z] and the special characters it accepts)
+    _PASSWORD_UPPER = frozenset(string.ascii_uppercase)
+    _PASSWORD_LOWER = frozenset(string.ascii_lowercase)
+    _PASSWORD_SPECIAL = frozenset('!@#$%^&*(),.?":{}|<>')
+    # Deletes what r'[\s\-\(\)]' matched: dashes, parentheses and every Unicode whitespace (all below U+3001)
+    _MOBILE_STRIP_TABLE = str.maketrans('', '', '-()' + ''.join(c for c in map(chr, range(0x3001)) if c.isspace()))
+    
     @classmethod
     def sanitize_input(cls, input_value: Any, max_length: int = 1000) -> str:
         """
@@ -65,20 +90,23 @@ class SecurityValidator:
         # Convert to string and limit length
         text = str(input_value)[:max_length]
         
-        # HTML escape to prevent XSS
-        text = html.escape(text, quote=True)
-        
-        # Remove dangerous patterns
-        for pattern in cls.DANGEROUS_PATTERNS:
-            text = re.sub(pattern, '', text, flags=re.IGNORECASE)
+        # Most input is plain text; escaping and pattern removal are no-ops for it
+        if cls._MARKUP_CHARS_RE.search(text):
+            # HTML escape to prevent XSS
+            text = html.escape(text, quote=True)
+            
+            # Remove dangerous patterns, repeating until none are left: a removal can join the
+            # text around it into a new match (e.g. "evaljavascript:(" leaves "eval(")
+            text, removed = cls._DANGEROUS_RE.subn('', text)
+            while removed:
+                text, removed = cls._DANGEROUS_RE.subn('', text)
         
         # Check for SQL injection attempts
-        for pattern in cls.SQL_INJECTION_PATTERNS:
-            if re.search(pattern, text, re.IGNORECASE):
-                raise ValueError("Potentially malicious input detected")
+        if cls._SQL_INJECTION_RE.search(text):
+            raise ValueError("Potentially malicious input detected")
         
         # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = cls._WHITESPACE_RE.sub(' ', text).strip()
         
         return text
     
@@ -88,8 +116,7 @@ class SecurityValidator:
         if not email:
             return False
         
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, email)) and len(email) <= 254
+        return bool(cls._EMAIL_RE.match(email)) and len(email) <= 254
     
     @classmethod
     def validate_password(cls, password: str) -> Dict[str, Any]:
@@ -110,16 +137,19 @@ class SecurityValidator:
         if len(password) > 128:
             issues.append("Password too long (max 128 characters)")
         
-        if not re.search(r'[A-Z]', password):
+        # One pass over the password; each class check then only looks at its distinct characters
+        chars = set(password)
+        
+        if chars.isdisjoint(cls._PASSWORD_UPPER):
             issues.append("Password must contain uppercase letter")
         
-        if not re.search(r'[a-z]', password):
+        if chars.isdisjoint(cls._PASSWORD_LOWER):
             issues.append("Password must contain lowercase letter")
         
-        if not re.search(r'\d', password):
+        if not any(ch.isdecimal() for ch in chars): # Same characters as \d
             issues.append("Password must contain number")
         
-        if not re.search(r'[!@#$%^&*(),.?":{}|<>]', password):
+        if chars.isdisjoint(cls._PASSWORD_SPECIAL):
             issues.append("Password must contain special character")
         
         return {
@@ -134,15 +164,8 @@ class SecurityValidator:
         if not reg_no:
             return False
         
-        # Common NCC reg number patterns (adjust as needed)
-        patterns = [
-            r'^\d{2}[A-Z]{2}\d{8}$',  # 2 digits + 2 letters + 8 digits
-            r'^[A-Z]{2}\d{10}$',      # 2 letters + 10 digits
-            r'^\d{12}$',              # 12 digits
-        ]
-        
         reg_no = reg_no.upper().strip()
-        return any(re.match(pattern, reg_no) for pattern in patterns)
+        return bool(cls._NCC_REG_NO_RE.match(reg_no))
     
     @classmethod
     def validate_mobile(cls, mobile: str) -> bool:
@@ -151,7 +174,7 @@ class SecurityValidator:
             return False
         
         # Remove spaces, dashes, and parentheses
-        mobile = re.sub(r'[\s\-\(\)]', '', mobile)
+        mobile = mobile.translate(cls._MOBILE_STRIP_TABLE)
         
         # Remove country code if present
         if mobile.startswith('+91'):
@@ -160,7 +183,7 @@ class SecurityValidator:
             mobile = mobile[2:]
         
         # Check if it's a valid 10-digit Indian mobile number
-        return bool(re.match(r'^[6-9]\d{9}$', mobile))
+        return bool(cls._MOBILE_RE.match(mobile))
     
     @classmethod
     def validate_input(cls, input_value: str, input_type: str = "text", max_length: int = 1000) -> Dict[str, Any]:
@@ -194,16 +217,7 @@ class SecurityValidator:
                     'sanitized': text[:max_length]
                 }
             
-            # Type-specific validation
-            if input_type == "email":
-                if not cls.validate_email(text):
-                    return {
-                        'valid': False,
-                        'error': 'Invalid email format',
-                        'sanitized': cls.sanitize_input(text, max_length)
-                    }
-            
-            elif input_type == "password":
+            if input_type == "password":
                 password_check = cls.validate_password(text)
                 if not password_check['valid']:
                     return {
@@ -218,45 +232,43 @@ class SecurityValidator:
                     'sanitized': text
                 }
             
-            elif input_type == "mobile":
-                if not cls.validate_mobile(text):
-                    return {
-                        'valid': False,
-                        'error': 'Invalid mobile number format',
-                        'sanitized': cls.sanitize_input(text, max_length)
-                    }
-            
-            elif input_type == "name":
-                if len(text.strip()) < 2:
-                    return {
-                        'valid': False,
-                        'error': 'Name must be at least 2 characters',
-                        'sanitized': cls.sanitize_input(text, max_length)
-                    }
-            
-            # Sanitize the input
+            # Sanitize the input once; the type-specific checks reuse it for their error results too
             sanitized = cls.sanitize_input(text, max_length)
             
+            # Type-specific validation
+            error = None
+            if input_type == "email" and not cls.validate_email(text):
+                error = 'Invalid email format'
+            elif input_type == "mobile" and not cls.validate_mobile(text):
+                error = 'Invalid mobile number format'
+            elif input_type == "name" and len(text.strip()) < 2:
+                error = 'Name must be at least 2 characters'
+            
             return {
-                'valid': True,
-                'error': None,
+                'valid': error is None,
+                'error': error,
                 'sanitized': sanitized
             }
             
         except Exception as e:
+            # Not sanitized again: that is what just failed (e.g. malicious input), and would only raise again
             return {
                 'valid': False,
                 'error': f'Validation error: {str(e)}',
-                'sanitized': cls.sanitize_input(str(input_value), max_length) if input_value else ''
+                'sanitized': ''
             }
 
 
 class RateLimiter:
     """Rate limiting implementation"""
     
-    def __init__(self):
-        if 'rate_limit_data' not in st.session_state:
-            st.session_state.rate_limit_data = {}
+    # Holds no state itself: request times live in each session's st.session_state.rate_limit_data,
+    # so one instance can serve every session (see _RATE_LIMITER)
+    
+    @staticmethod
+    def _session_data() -> Dict[str, deque]:
+        """Returns this session's request times per key, creating the store on first use."""
+        return st.session_state.setdefault('rate_limit_data', {})
     
     def check_rate_limit(self, key: str, max_requests: int = 10, window_minutes: int = 5) -> bool:
         """
@@ -284,37 +296,40 @@ class RateLimiter:
         Returns:
             True if rate limited, False otherwise
         """
-        now = datetime.now()
-        window_start = now - timedelta(minutes=window_minutes)
+        now = time.monotonic()
+        window_start = now - window_minutes * 60
+        
+        # Request times (monotonic seconds) are appended in order, so expired ones are all at the left
+        rate_limit_data = self._session_data()
+        timestamps = rate_limit_data.get(key)
+        if not isinstance(timestamps, deque): # First request for key, or a list from an older session
+            timestamps = rate_limit_data[key] = deque(
+                t for t in (timestamps or ()) if isinstance(t, float)
+            )
         
         # Clean old entries
-        if key in st.session_state.rate_limit_data:
-            st.session_state.rate_limit_data[key] = [
-                timestamp for timestamp in st.session_state.rate_limit_data[key]
-                if timestamp > window_start
-            ]
-        else:
-            st.session_state.rate_limit_data[key] = []
+        while timestamps and timestamps[0] <= window_start:
+            timestamps.popleft()
         
         # Check if rate limited
-        if len(st.session_state.rate_limit_data[key]) >= max_requests:
+        if len(timestamps) >= max_requests:
             return True
         
         # Record this request
-        st.session_state.rate_limit_data[key].append(now)
+        timestamps.append(now)
         return False
     
     def get_reset_time(self, key: str, window_minutes: int = 5) -> Optional[datetime]:
         """Get when the rate limit resets for a key"""
-        if key not in st.session_state.rate_limit_data:
-            return None
-        
-        timestamps = st.session_state.rate_limit_data[key]
+        timestamps = self._session_data().get(key)
         if not timestamps:
             return None
         
-        oldest_timestamp = min(timestamps)
-        return oldest_timestamp + timedelta(minutes=window_minutes)
+        # Oldest request is at the left; convert its monotonic expiry to wall-clock time only here
+        seconds_left = timestamps[0] + window_minutes * 60 - time.monotonic()
+        return datetime.now() + timedelta(seconds=seconds_left)
+
+_RATE_LIMITER = RateLimiter() # Shared by every rate_limit-decorated call
 
 def rate_limit(max_requests: int = 10, window_minutes: int = 5, key_func=None):
     """
@@ -336,7 +351,7 @@ def rate_limit(max_requests: int = 10, window_minutes: int = 5, key_func=None):
                 key = f"{func.__name__}_{user_id}"
             
             # Check rate limit
-            limiter = RateLimiter()
+            limiter = _RATE_LIMITER
             if limiter.is_rate_limited(key, max_requests, window_minutes):
                 reset_time = limiter.get_reset_time(key, window_minutes)
                 reset_str = reset_time.strftime("%H:%M:%S") if reset_time else "soon"
@@ -409,7 +424,7 @@ def validate_user_registration(name: str, email: str, mobile: str, reg_no: str,
         "sanitized_data": {
             "name": SecurityValidator.sanitize_input(name, 100),
             "email": email.lower().strip(),
-            "mobile": re.sub(r'[\s\-\(\)]', '', mobile),
+            "mobile": mobile.translate(SecurityValidator._MOBILE_STRIP_TABLE),
             "reg_no": SecurityValidator.sanitize_input(reg_no, 20),
         }
     }
@@ -542,11 +557,11 @@ def secure_quiz_input(quiz_input: str) -> Dict[str, Any]:
 
 def get_client_id() -> str:
     """Get a client identifier for rate limiting"""
-    # In Streamlit, we can use session state
-    if 'client_id' not in st.session_state:
-        import uuid
-        st.session_state.client_id = str(uuid.uuid4())
-    return st.session_state.client_id
+    # In Streamlit, we can use session state (one lookup when the id already exists)
+    client_id = st.session_state.get('client_id')
+    if client_id is None:
+        client_id = st.session_state.client_id = str(uuid.uuid4())
+    return client_id
 
 def secure_chat_input(message: str) -> Dict[str, Any]:
     """Secure and validate chat input"""
@@ -563,8 +578,8 @@ def secure_chat_input(message: str) -> Dict[str, Any]:
                 'message': message
             }
         
-        # Additional chat-specific validation
-        if len(result['sanitized'].strip()) < 3:
+        # Additional chat-specific validation (sanitized text is already stripped)
+        if len(result['sanitized']) < 3:
             return {
                 'valid': False,
                 'error': 'Message too short (minimum 3 characters)',
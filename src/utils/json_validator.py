@@ -2,9 +2,18 @@
 JSON schema validation for data files
 """
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable
 from pathlib import Path
 import jsonschema
+try:
+    import fastjsonschema # Compiles each schema into a specialized Python function
+except ImportError:
+    fastjsonschema = None
+
+# Exceptions raised for data that does not match a schema, by either validator backend
+_SCHEMA_ERRORS = (jsonschema.exceptions.ValidationError,) + (
+    (fastjsonschema.JsonSchemaValueException,) if fastjsonschema is not None else ()
+)
 
 # Schema definitions
 SYLLABUS_SCHEMA = {
@@ -67,6 +76,38 @@ VIDEOS_SCHEMA = {
     "additionalProperties": False # No other top-level keys unless defined (like 'version' or category names)
 }
 
+# Built validators keyed by the schema's canonical JSON, so the metaschema check and
+# validator construction (or code generation) happen once per schema rather than on every validation
+_VALIDATOR_CACHE: Dict[str, Callable[[Any], None]] = {}
+
+def _get_validator(schema: Dict[str, Any]) -> Callable[[Any], None]:
+    """
+    Returns a cached function that raises on data not matching schema.
+    Uses fastjsonschema's generated validator when installed, jsonschema otherwise.
+    """
+    cache_key = json.dumps(schema, sort_keys=True)
+    validator = _VALIDATOR_CACHE.get(cache_key)
+    if validator is None:
+        if fastjsonschema is not None:
+            # Formats are annotations only, as with jsonschema's default validators
+            validator = fastjsonschema.compile(schema, use_formats=False)
+        else:
+            validator = _build_jsonschema_validator(schema)
+        _VALIDATOR_CACHE[cache_key] = validator
+    return validator
+
+def _build_jsonschema_validator(schema: Dict[str, Any]) -> Callable[[Any], None]:
+    """Wraps a jsonschema validator with the same error selection as jsonschema.validate."""
+    validator_cls = jsonschema.validators.validator_for(schema)
+    validator_cls.check_schema(schema)
+    schema_validator = validator_cls(schema)
+
+    def validate(data: Any) -> None:
+        error = jsonschema.exceptions.best_match(schema_validator.iter_errors(data))
+        if error is not None:
+            raise error
+    return validate
+
 def validate_json_file(file_path: str, schema: Dict[str, Any]) -> tuple[bool, Optional[str]]:
     """
     Validates a JSON file against a schema
@@ -75,11 +116,11 @@ def validate_json_file(file_path: str, schema: Dict[str, Any]) -> tuple[bool, Op
     try:
         with open(file_path, 'r') as f:
             data = json.load(f)
-        jsonschema.validate(instance=data, schema=schema)
+        _get_validator(schema)(data)
         return True, None
     except json.JSONDecodeError as e:
         return False, f"Invalid JSON format: {str(e)}"
-    except jsonschema.exceptions.ValidationError as e:
+    except _SCHEMA_ERRORS as e:
         return False, f"Schema validation error: {str(e)}"
     except Exception as e:
         return False, f"Error validating {file_path}: {str(e)}"
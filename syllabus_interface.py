@@ -30,10 +30,23 @@ st.markdown("""
         </style>
         """, unsafe_allow_html=True)
 
+@st.cache_data(ttl=3600)
+def _cached_syllabus_data():
+    """Loads the syllabus chapters/sections once per hour instead of on every rerun."""
+    return load_syllabus_data()
+
+@st.cache_data(ttl=3600)
+def _cached_pdf_metadata(pdf_path):
+    """Extracts the handbook outline once per process rather than once per user session."""
+    metadata = extract_pdf_metadata(pdf_path)
+    if metadata:
+        return metadata
+    return {"total_pages": 1, "outline": [], "error": "Failed to extract metadata."}
+
 def show_syllabus_viewer():
     try:
         ncc_handbook_pdf_path = NCC_HANDBOOK_PDF
-        syllabus_data = load_syllabus_data()
+        syllabus_data = _cached_syllabus_data()
         tab1, tab2 = st.tabs(["Syllabus Structure", "View NCC Handbook (PDF)"])
         with tab1:
             st.subheader("Browse Syllabus Content")
@@ -101,16 +114,9 @@ def show_syllabus_viewer():
                 st.session_state.pdf_current_page = 1
             if os.path.exists(ncc_handbook_pdf_path):
                 try:
-                    if "pdf_metadata" not in st.session_state or st.session_state.get("pdf_metadata_path") != ncc_handbook_pdf_path:
-                        metadata = extract_pdf_metadata(ncc_handbook_pdf_path)
-                        if metadata:
-                            st.session_state.pdf_metadata = metadata
-                            st.session_state.pdf_metadata_path = ncc_handbook_pdf_path
-                        else:
-                            st.session_state.pdf_metadata = {"total_pages": 1, "outline": [], "error": "Failed to extract metadata."}
-                            st.session_state.pdf_metadata_path = ncc_handbook_pdf_path
-                    total_pages = st.session_state.get("pdf_metadata", {}).get("total_pages", 1)
-                    pdf_outline = st.session_state.get("pdf_metadata", {}).get("outline", [])
+                    pdf_metadata = _cached_pdf_metadata(ncc_handbook_pdf_path)
+                    total_pages = pdf_metadata.get("total_pages", 1)
+                    pdf_outline = pdf_metadata.get("outline", [])
                     with st.container():
                         navigation_mode_main = st.radio(
                             "Navigate Handbook By:",
@@ -1,5 +1,5 @@
-import json
 import os
+import orjson
 import logging
 import streamlit as st # Import streamlit for st.error etc.
 from dataclasses import dataclass, field
@@ -17,12 +17,23 @@ class Section:
     name: str
     page_number: Optional[int] = None # Added for PDF navigation
     content: Optional[str] = None  # Optional field for more detailed content
+    # Lowercased copies for case-insensitive search, computed once when the syllabus is loaded
+    name_lower: str = field(init=False, repr=False, compare=False)
+    content_lower: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.name_lower = self.name.lower() if isinstance(self.name, str) else ""
+        self.content_lower = self.content.lower() if isinstance(self.content, str) else ""
 
 @dataclass
 class Chapter:
     """Represents a chapter in the NCC syllabus."""
     title: str
     sections: List[Section] = field(default_factory=list)  # List of Section objects
+    title_lower: str = field(init=False, repr=False, compare=False) # For case-insensitive search
+
+    def __post_init__(self):
+        self.title_lower = self.title.lower() if isinstance(self.title, str) else ""
 
 @dataclass
 class SyllabusData:
@@ -123,8 +134,8 @@ def load_syllabus_data(file_name: str = DEFAULT_SYLLABUS_FILENAME) -> Optional[S
         logging.error(f"Syllabus file not found at path: {file_path}")
         return None
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(file_path, 'rb') as f:
+            data = orjson.loads(f.read())
 
         # Validate the basic structure
         if 'version' not in data or 'chapters' not in data:
@@ -163,7 +174,7 @@ def load_syllabus_data(file_name: str = DEFAULT_SYLLABUS_FILENAME) -> Optional[S
             return None
         return syllabus
         
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         logging.error(f"Error parsing syllabus JSON: {e}")
     except FileNotFoundError:
         logging.error(f"Syllabus file not found at '{file_path}'. Please ensure it exists and the path is correct.")
@@ -225,10 +236,8 @@ def search_syllabus(syllabus_data: Optional[SyllabusData], query: str) -> List[D
             logging.warning(f"Skipping chapter in search due to non-string title: {chapter}")
             continue
         
-        chapter_title_lower = chapter.title.lower()
-        
         # Check if chapter title matches
-        if query_lower in chapter_title_lower:
+        if query_lower in chapter.title_lower:
             results.append({
                 "chapter_title": chapter.title,
                 "match_type": "chapter",
@@ -242,8 +251,7 @@ def search_syllabus(syllabus_data: Optional[SyllabusData], query: str) -> List[D
                 logging.warning(f"Skipping section in chapter '{chapter.title}' due to non-string name: {section}")
                 continue
 
-            section_name_lower = section.name.lower()
-            if query_lower in section_name_lower:
+            if query_lower in section.name_lower:
                 match_info = {
                     "chapter_title": chapter.title,
                     "section_name": section.name,
@@ -256,7 +264,8 @@ def search_syllabus(syllabus_data: Optional[SyllabusData], query: str) -> List[D
             
             # Optionally, search within section.content as well
             if section.content and isinstance(section.content, str):
-                if query_lower in section.content.lower():
+                match_pos = section.content_lower.find(query_lower)
+                if match_pos >= 0:
                     # Avoid duplicate if name already matched
                     is_already_added = any(
                         r.get("chapter_title") == chapter.title and 
@@ -270,7 +279,7 @@ def search_syllabus(syllabus_data: Optional[SyllabusData], query: str) -> List[D
                             "section_name": section.name,
                             "match_type": "section_content",
                             "page_number": section.page_number, # Add page number
-                            "content_preview": f"Content in section '{section.name}': ...{section.content[max(0, section.content.lower().find(query_lower)-20) : section.content.lower().find(query_lower)+len(query_lower)+20]}..."
+                            "content_preview": f"Content in section '{section.name}': ...{section.content[max(0, match_pos-20) : match_pos+len(query_lower)+20]}..."
                         })
 
 
@@ -317,8 +326,8 @@ if __name__ == "__main__":
         os.makedirs(data_dir_for_dummy, exist_ok=True)
     dummy_file_path = os.path.join(data_dir_for_dummy, "syllabus.json") # Assuming DEFAULT_SYLLABUS_FILENAME is "data/syllabus.json"
     try:
-        with open(dummy_file_path, "w", encoding="utf-8") as f:
-            json.dump(dummy_syllabus_content, f, indent=4)
+        with open(dummy_file_path, "wb") as f: # Same orjson codec the loader uses
+            f.write(orjson.dumps(dummy_syllabus_content, option=orjson.OPT_INDENT_2))
         logging.info(f"Created dummy syllabus file at '{dummy_file_path}' for testing.")
     except IOError as e:
         logging.error(f"Failed to create dummy syllabus file: {e}")
@@ -1,6 +1,8 @@
 import os
 import json
 import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, Any, List
 from pathlib import Path
 import streamlit as st
@@ -22,10 +24,29 @@ def save_offline_queue(queue: List[Dict[str, Any]]):
         json.dump(queue, f)
 
 # --- Add to Queue ---
+_queue_lock = threading.Lock()  # Serializes read-modify-write of the queue file within this process
+
 def queue_for_sync(data: Dict[str, Any], data_type: str):
-    queue = load_offline_queue()
-    queue.append({"type": data_type, "data": data})
-    save_offline_queue(queue)
+    with _queue_lock:
+        queue = load_offline_queue()
+        result_id = data.get("result_id")
+        if result_id and any(item.get("data", {}).get("result_id") == result_id for item in queue):
+            return  # Already queued (e.g. the same quiz result recorded twice by a rerun)
+        queue.append({"type": data_type, "data": data})
+        save_offline_queue(queue)
+
+@st.cache_resource
+def _sync_executor() -> ThreadPoolExecutor:
+    """One background worker shared by all sessions, so queued writes stay in order."""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="sync-queue")
+
+def _log_queue_failure(future: Future):
+    if future.exception():
+        logging.warning(f"Queueing for sync failed: {future.exception()}")
+
+def queue_for_sync_background(data: Dict[str, Any], data_type: str):
+    """Like queue_for_sync, but writes the queue file on a background thread instead of the render path."""
+    _sync_executor().submit(queue_for_sync, data, data_type).add_done_callback(_log_queue_failure)
 
 # --- Sync to Firestore ---
 def sync_to_cloud():
@@ -34,7 +55,8 @@ def sync_to_cloud():
     user_id = st.session_state.get("user_id")
     if not user_id:
         return 0
-    queue = load_offline_queue()
+    with _queue_lock:
+        queue = load_offline_queue()
     synced = 0
     new_queue = []
     for item in queue:
@@ -56,7 +78,10 @@ def sync_to_cloud():
         except Exception as e:
             logging.warning(f"Sync failed for {item['type']}: {e}")
             new_queue.append(item)
-    save_offline_queue(new_queue)
+    # The uploads above run without the lock; re-read under it and keep anything queued meanwhile
+    with _queue_lock:
+        new_queue.extend(item for item in load_offline_queue() if item not in queue)
+        save_offline_queue(new_queue)
     return synced
 
 # --- UI Sync Status ---
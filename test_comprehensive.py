@@ -158,9 +158,64 @@ class NCC_ABYAS_Tester:
             has_analytics_function = hasattr(quiz_analytics, 'create_quiz_performance_summary')
             self.log_test("Quiz analytics functions exist", has_analytics_function)
             
+            # Saved score history stores a percentage per quiz and no total_questions
+            from datetime import datetime
+            now = datetime.now().isoformat()
+            history = [
+                {"timestamp": now, "score": 80.0, "difficulty": "Medium", "topic": "Drill"},
+                {"timestamp": now, "score": 60.0, "difficulty": "Medium", "topic": "Drill"},
+            ]
+            metrics = quiz_analytics.QuizAnalytics.calculate_performance_metrics(history)
+            self.log_test("Percentage history averaged as-is", metrics["average_score"] == 70.0,
+                          f"average_score={metrics['average_score']}")
+            self.log_test("Recent performance uses stored percentages", "70.0% avg" in metrics["recent_performance"],
+                          metrics["recent_performance"])
+            
         except Exception as e:
             self.log_test("Quiz analytics", False, str(e))
     
+    def test_quiz_cache(self) -> None:
+        """Test the quiz question pool cache"""
+        print("\n🗃️ Testing Quiz Cache...")
+        
+        try:
+            import tempfile
+            from unittest import mock
+            import quiz_cache
+            
+            with tempfile.TemporaryDirectory() as tmp_dir, \
+                    mock.patch.object(quiz_cache, 'QUIZ_CACHE_DB', os.path.join(tmp_dir, 'quiz_cache.db')):
+                # Same settings give the same key, different settings a different one
+                key = quiz_cache.make_key("Drill", "Medium")
+                self.log_test("Cache key is stable",
+                              key == quiz_cache.make_key("Drill", "Medium") and key != quiz_cache.make_key("Drill", "Hard"))
+                
+                # A stored _id is reused as the question hash
+                self.log_test("Question hash reuses _id", quiz_cache.question_hash({"question": "Q", "_id": "abc"}) == "abc")
+                
+                # Entries expire after the TTL
+                pool = [{"question": f"Question {i}"} for i in range(4)]
+                quiz_cache.put(key, pool)
+                self.log_test("Pool read back", quiz_cache.get(key) == pool)
+                expired_at = time.time() + quiz_cache.QUIZ_CACHE_TTL_SECONDS + 1
+                with mock.patch.object(quiz_cache.time, 'time', return_value=expired_at):
+                    self.log_test("Expired pool is a miss", quiz_cache.get(key) is None and quiz_cache.version(key) is None)
+                
+                # Unseen questions are drawn before seen ones
+                first = quiz_cache.draw(pool, 2, "cadet")
+                second = quiz_cache.draw(pool, 2, "cadet")
+                first_hashes = {quiz_cache.question_hash(q) for q in first}
+                self.log_test("Draw prefers unseen questions",
+                              not first_hashes & {quiz_cache.question_hash(q) for q in second})
+                self.log_test("Exhausted pool has no unseen questions", quiz_cache.unseen_count(pool, "cadet") == 0)
+                
+                # Extending keeps the old questions and skips duplicates
+                extended = quiz_cache.extend(key, pool[:1] + [{"question": "Question 4"}])
+                self.log_test("Pool extended without duplicates", len(extended) == 5 and quiz_cache.unseen_count(extended, "cadet") == 1)
+            
+        except Exception as e:
+            self.log_test("Quiz cache", False, str(e))
+    
     def test_mobile_ui(self) -> None:
         """Test mobile UI components"""
         print("\n📱 Testing Mobile UI...")
@@ -247,6 +302,7 @@ class NCC_ABYAS_Tester:
         self.test_offline_functionality()
         self.test_chat_enhancements()
         self.test_quiz_analytics()
+        self.test_quiz_cache()
         self.test_mobile_ui()
         self.test_accessibility_features()
         self.test_performance_optimizations()